@@ -62,7 +62,6 @@ autodoc_mock_imports = [
     "numpy",
     "pandas",
     "geopandas",
-    "bs4",
     "tqdm",
     "rasterio",
     "appdirs",
@@ -321,14 +321,13 @@ class GeoHealthAccess:
         # Surface water
         catalog = gsw.GSW()
         tiles = catalog.search(self.area_of_interest)
-        for tile in tiles:
-            catalog.download(
-                tile,
-                "seasonality",
-                os.path.join(self.raw_dir, "gsw"),
-                show_progress=show_progress,
-                overwrite=overwrite,
-            )
+        catalog.download_many(
+            tiles,
+            "seasonality",
+            os.path.join(self.raw_dir, "gsw"),
+            show_progress=show_progress,
+            overwrite=overwrite,
+        )
 
         # Elevation
         catalog = srtm.SRTM()
@@ -339,13 +338,12 @@ class GeoHealthAccess:
             raise GeoHealthAccessError("NASA EarthData credentials not provided.")
         catalog.authentify(earthdata_username, earthdata_password)
         tiles = catalog.search(self.area_of_interest)
-        for tile in tiles:
-            catalog.download(
-                tile,
-                os.path.join(self.raw_dir, "srtm"),
-                show_progress=show_progress,
-                overwrite=overwrite,
-            )
+        catalog.download_many(
+            tiles,
+            os.path.join(self.raw_dir, "srtm"),
+            show_progress=show_progress,
+            overwrite=overwrite,
+        )
 
     def preprocessing(self, show_progress=True, overwrite=False):
         """Preprocess input data to a common raster grid.
@@ -25,23 +25,72 @@ References
    Nature 540, 418-422 (2016) [DOI: 10.1038/nature20584].
 """
 
-import itertools
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
 from tempfile import TemporaryDirectory
 
 import geopandas as gpd
-import requests
+import numpy as np
 from loguru import logger
 from rasterio.crs import CRS
 from rasterio.warp import transform_bounds
-from shapely.geometry import Polygon
+from shapely.geometry import box
 
 from geohealthaccess import storage
 from geohealthaccess.preprocessing import mask_raster, merge_tiles, reproject
-from geohealthaccess.utils import download_from_url, size_from_url
+from geohealthaccess.utils import download_from_url, http_session, size_from_url
 
 logger.disable("__name__")
 
+# GSW tiles weigh up to a few dozen MB: they are streamed in 1 MiB chunks
+GSW_CHUNK_SIZE = 1 << 20
+
+
+def _grid_location_ids(lats, lons):
+    """Generate the GSW location IDs of tiles from their top-left coordinates.
+
+    Vectorized equivalent of `GSW.location_id()` for coordinates that are
+    already aligned on the 10° x 10° grid.
+
+    Parameters
+    ----------
+    lats : 1d array of int
+        Latitudes of the top-left corners (multiples of 10).
+    lons : 1d array of int
+        Longitudes of the top-left corners (multiples of 10).
+
+    Returns
+    -------
+    1d array of str
+        GSW location IDs.
+    """
+    lats, lons = np.asarray(lats), np.asarray(lons)
+    latpol = np.where(lats < 0, "S", "N")
+    lonpol = np.where(lons < 0, "W", "E")
+    lat_ids = np.char.add(np.abs(lats).astype(str), latpol)
+    lon_ids = np.char.add(np.abs(lons).astype(str), lonpol)
+    return np.char.add(np.char.add(lon_ids, "_"), lat_ids)
+
+
+@functools.lru_cache(maxsize=1)
+def _tiles_index():
+    """Build a GeoDataFrame of the 10 x 10 degrees GSW tiles.
+
+    The grid never changes, so it is only built once per process.
+    """
+    lons, lats = np.meshgrid(
+        np.arange(-180, 180, 10), np.arange(-50, 90, 10), indexing="ij"
+    )
+    lons, lats = lons.ravel(), lats.ravel()
+    geoms = [
+        box(lon, lat - 10, lon + 10, lat)
+        for lon, lat in zip(lons.tolist(), lats.tolist())
+    ]
+    names = _grid_location_ids(lats, lons).tolist()
+    return gpd.GeoDataFrame(index=names, geometry=geoms, crs=CRS.from_epsg(4326))
+
 
 class GSW:
     """Global Surface Water tile index."""
@@ -57,8 +106,9 @@ class GSW:
             "transitions",
             "extent",
         ]
-        self.session = requests.Session()
-        self.sindex = self.spatial_index()
+        # Keep enough connections alive for concurrent downloads
+        self.session = http_session(pool_maxsize=16)
+        self._sindex = None
 
     def __repr__(self):
         return "geohealthaccess.gsw.GSW()"
@@ -117,24 +167,16 @@ class GSW:
 
         return f"{lon}{lonpol}_{lat}{latpol}"
 
+    @property
+    def sindex(self):
+        """Spatial index of GSW tiles, built on first access."""
+        if self._sindex is None:
+            self._sindex = self.spatial_index()
+        return self._sindex
+
     def spatial_index(self):
         """Build the spatial index."""
-        geoms, names = [], []
-        # Build a grid with 10 x 10 degrees cells
-        for lon, lat in itertools.product(range(-180, 180, 10), range(-50, 90, 10)):
-            geoms.append(
-                Polygon(
-                    (
-                        (lon, lat),
-                        (lon + 10, lat),
-                        (lon + 10, lat - 10),
-                        (lon, lat - 10),
-                        (lon, lat),
-                    )
-                )
-            )
-            names.append(self.location_id(lat, lon))
-        sindex = gpd.GeoDataFrame(index=names, geometry=geoms, crs=CRS.from_epsg(4326))
+        sindex = _tiles_index()
         logger.info(f"GSW tiles indexed ({len(sindex)} tiles).")
         return sindex
 
@@ -151,9 +193,12 @@ class GSW:
         list of tiles
             List of required GSW tiles.
         """
-        tiles = self.sindex[self.sindex.intersects(geom)]
+        # Query the R-tree so that the predicate is only evaluated for the
+        # tiles whose bounding box intersects the area of interest
+        idx = self.sindex.sindex.query(geom, predicate="intersects")
+        tiles = self.sindex.index[np.sort(idx)].tolist()
         logger.info(f"{len(tiles)} tiles are required to cover the area of interest.")
-        return list(tiles.index)
+        return tiles
 
     def url(self, tile, product):
         """Get download URL of a GSW tile.
@@ -173,7 +218,15 @@ class GSW:
         self._checkproduct(product)
         return f"{self.BASEURL}/{product}/{product}_{tile}_v{self.VERSION}.tif"
 
-    def download(self, tile, product, output_dir, show_progress=True, overwrite=False):
+    def download(
+        self,
+        tile,
+        product,
+        output_dir,
+        show_progress=True,
+        overwrite=False,
+        pbar_position=0,
+    ):
         """Download a GSW tile.
 
         Parameters
@@ -188,6 +241,8 @@ class GSW:
             Show download progress bar.
         overwrite : bool, optional
             Force overwrite of existing files.
+        pbar_position : int, optional (default=0)
+            Absolute position of the progress bar.
 
         Returns
         -------
@@ -196,9 +251,69 @@ class GSW:
         """
         url = self.url(tile, product)
         return download_from_url(
-            self.session, url, output_dir, show_progress, overwrite
+            self.session,
+            url,
+            output_dir,
+            show_progress,
+            overwrite,
+            pbar_position=pbar_position,
+            chunk_size=GSW_CHUNK_SIZE,
         )
 
+    def download_many(
+        self, tiles, product, output_dir, workers=4, show_progress=True, overwrite=False
+    ):
+        """Download multiple GSW tiles concurrently.
+
+        Tiles are downloaded in a pool of threads sharing the HTTP connections
+        of the catalog session.
+
+        Parameters
+        ----------
+        tiles : list of str
+            GSW tile location ids.
+        product : str
+            GSW product type.
+        output_dir : str
+            Path to output directory.
+        workers : int, optional
+            Max. number of concurrent downloads. Default=4.
+        show_progress : bool, optional
+            Show download progress bars.
+        overwrite : bool, optional
+            Force overwrite of existing files.
+
+        Returns
+        -------
+        list of str
+            Paths to output files, in the same order as `tiles`.
+        """
+        self._checkproduct(product)
+        storage.mkdir(output_dir)
+
+        # Each running download holds one progress bar position and gives it
+        # back when done, so that concurrent bars never share a line
+        positions = Queue()
+        for position in range(workers):
+            positions.put(position)
+
+        def task(tile):
+            position = positions.get()
+            try:
+                return self.download(
+                    tile,
+                    product,
+                    output_dir,
+                    show_progress=show_progress,
+                    overwrite=overwrite,
+                    pbar_position=position,
+                )
+            finally:
+                positions.put(position)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(task, tiles))
+
     def download_size(self, tile, product):
         """Get download size of a GSW tile.
 
@@ -4,9 +4,12 @@ The module provides functions to work with .osm.pbf files.
 `Osmium <https://osmcode.org/osmium-tool/>`_ is required for most of them.
 """
 
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import run, PIPE, DEVNULL
 import tempfile
+import warnings
 import functools
 from pkg_resources import resource_filename
 
@@ -15,6 +18,7 @@ import numpy as np
 import requests
 import rasterio
 from rasterio.features import rasterize
+from rasterio.profiles import DefaultGTiffProfile
 import geopandas as gpd
 
 from geohealthaccess import storage
@@ -34,6 +38,19 @@ from geohealthaccess.utils import (
 logger.disable(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _geofabrik_catalog():
+    """Load the Geofabrik catalog from the resource file.
+
+    The GeoJSON file is only parsed once per process and the resulting
+    GeoDataFrame is shared by all `Geofabrik` instances.
+    """
+    catalog = gpd.read_file(
+        resource_filename(__name__, "resources/geofabrik.geojson"), driver="GeoJSON"
+    )
+    return catalog.set_index("id")
+
+
 class Geofabrik:
     """Acess OSM data hosted on Geofabrik website.
 
@@ -42,10 +59,8 @@ class Geofabrik:
 
     def __init__(self):
         """Initialize Geofabrik catalog."""
-        self.catalog = gpd.read_file(
-            resource_filename(__name__, "resources/geofabrik.geojson"), driver="GeoJSON"
-        )
-        self.catalog.set_index("id", inplace=True)
+        self.catalog = _geofabrik_catalog()
+        self.session = requests.Session()
 
     def search(self, geom, min_cover=98):
         """Search product matching the input geometry.
@@ -68,11 +83,19 @@ class Geofabrik:
         str
             URL of the .osm.pbf file.
         """
-        results = self.catalog[self.catalog.intersects(geom)]
-        contains = results.geometry.apply(
-            lambda g: geom.intersection(g).area / geom.area
-        )
-        results = results[contains >= min_cover / 100]
+        idx = self.catalog.sindex.query(geom, predicate="intersects")
+        results = self.catalog.iloc[np.sort(idx)]
+        # Coverage of the area of interest by each candidate, computed on the
+        # whole GeoSeries at once instead of one geometry at a time. Areas are
+        # only compared as a ratio, so degrees are fine here.
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "ignore",
+                message="Geometry is in a geographic CRS",
+                category=UserWarning,
+            )
+            cover = results.geometry.intersection(geom).area / geom.area
+        results = results[cover >= min_cover / 100]
         if results.empty:
             raise GeoHealthAccessError("Found no matching OSM product on Geofabrik.")
         results = results.to_crs(epsg=3857)
@@ -103,11 +126,13 @@ class Geofabrik:
         """
         geom = country_geometry(country)
         url = self.search(geom, min_cover=95).replace("https", "http")
-        with requests.Session() as s:
-            fp = download_from_url(
-                s, url, output_dir, show_progress=show_progress, overwrite=overwrite
-            )
-        return fp
+        return download_from_url(
+            self.session,
+            url,
+            output_dir,
+            show_progress=show_progress,
+            overwrite=overwrite,
+        )
 
 
 def requires_osmium(func):
@@ -239,25 +264,33 @@ def _centroid(geom):
 
 def _filter_columns(geodataframe, valid_columns):
     """Filter columns of a given geodataframe."""
-    n_removed = 0
-    for column in geodataframe.columns:
-        if column not in valid_columns and column != "geometry":
-            geodataframe = geodataframe.drop([column], axis=1)
-            n_removed += 1
-    logger.info(f"Removed {n_removed} columns. {len(geodataframe.columns)} remaining.")
+    # Drop all invalid columns at once as each call to drop() copies the data
+    invalid = [
+        column
+        for column in geodataframe.columns
+        if column not in valid_columns and column != "geometry"
+    ]
+    geodataframe = geodataframe.drop(columns=invalid)
+    logger.info(
+        f"Removed {len(invalid)} columns. {len(geodataframe.columns)} remaining."
+    )
     return geodataframe
 
 
 def _count_objects(osm_pbf):
-    """Count objects of each type in an .osm.pbf file."""
-    p = run(["osmium", "fileinfo", "-e", osm_pbf], stdout=PIPE, stderr=DEVNULL)
-    fileinfo = p.stdout.decode()
-    n_objects = {"nodes": 0, "ways": 0, "relations": 0}
-    for line in fileinfo.split("\n"):
-        for obj in n_objects:
-            if f"Number of {obj}" in line:
-                n_objects[obj] = int(line.split(":")[-1])
-    return n_objects
+    """Count objects of each type in an .osm.pbf file.
+
+    Objects are counted by libosmium in `osmium fileinfo`, whose JSON output
+    is parsed instead of scanning the text report line by line.
+    """
+    p = run(
+        ["osmium", "fileinfo", "--extended", "--json", osm_pbf],
+        stdout=PIPE,
+        stderr=DEVNULL,
+        check=True,
+    )
+    count = json.loads(p.stdout)["data"]["count"]
+    return {obj: count.get(obj, 0) for obj in ("nodes", "ways", "relations")}
 
 
 def _is_empty(osm_pbf):
@@ -267,6 +300,90 @@ def _is_empty(osm_pbf):
     return not bool(n_objects)
 
 
+def _osmium_extract(osm_pbf, theme, tmpdir):
+    """Filter the objects of a theme with osmium-tools and export to GeoJSON.
+
+    Parameters
+    ----------
+    osm_pbf : str
+        Path to input .osm.pbf file.
+    theme : str
+        Category of objects to extract.
+    tmpdir : str
+        Directory where intermediary files are written.
+
+    Returns
+    -------
+    str
+        Path to intermediary GeoJSON file.
+
+    Raises
+    ------
+    MissingData
+        If the input .osm.pbf file does not contain any feature related to
+        the selected theme.
+    """
+    expression = EXTRACTS[theme.lower()]["expression"]
+
+    # Filter input .osm.pbf file and export to GeoJSON with osmium-tools
+    filtered = tags_filter(
+        osm_pbf, os.path.join(tmpdir, "filtered.osm.pbf"), expression
+    )
+
+    # Abort if .osm.pbf is empty
+    if _is_empty(filtered):
+        raise MissingDataError(f"No {theme} features in {os.path.basename(osm_pbf)}.")
+
+    # An intermediary GeoJSON file so that data can be loaded with GeoPandas
+    return to_geojson(filtered, os.path.join(tmpdir, "intermediary.geojson"))
+
+
+def _save_extract(intermediary, theme, dst_fname):
+    """Clean the GeoJSON export of a theme and save it into a GeoPackage.
+
+    Parameters
+    ----------
+    intermediary : str
+        Path to intermediary GeoJSON file.
+    theme : str
+        Category of the extracted objects.
+    dst_fname : str
+        Path to output GeoPackage.
+
+    Returns
+    -------
+    str
+        Path to output GeoPackage.
+    """
+    properties = EXTRACTS[theme.lower()]["properties"] + ["geometry"]
+    geom_types = EXTRACTS[theme.lower()]["geom_types"]
+
+    # Drop useless columns
+    geodf = gpd.read_file(intermediary)
+    logger.info(f"Loaded OSM data into a GeoDataFrame with {len(geodf)} records.")
+    geodf = _filter_columns(geodf, properties)
+
+    # Convert Polygon or MultiPolygon features to Point
+    if theme == "health":
+        geodf["geometry"] = geodf.geometry.apply(_centroid)
+        logger.info("Converted Polygon and MultiPolygon to Point features.")
+
+    # Drop geometries of incorrect types
+    geodf = geodf[np.isin(geodf.geom_type, geom_types)]
+    logger.info(f"Removed objects with invalid geom types ({len(geodf)} remaining).")
+
+    # Reset index, set CRS and save to output file
+    geodf = geodf.reset_index(drop=True)
+    if not geodf.crs:
+        geodf.crs = {"init": "epsg:4326"}
+    geodf.to_file(dst_fname, driver="GPKG")
+    dst_size = human_readable_size(os.path.getsize(dst_fname))
+    logger.info(
+        f"Saved thematric extract into {os.path.basename(dst_fname)} ({dst_size})."
+    )
+    return dst_fname
+
+
 def thematic_extract(osm_pbf, theme, dst_fname):
     """Extract a category of objects from an .osm.pbf file into a GeoPackage.
 
@@ -299,55 +416,10 @@ def thematic_extract(osm_pbf, theme, dst_fname):
             f"Theme `{theme}` is not supported. Please choose one of the following "
             f"options: {', '.join(EXTRACTS.keys())}."
         )
-    expression = EXTRACTS[theme.lower()]["expression"]
-    properties = EXTRACTS[theme.lower()]["properties"] + ["geometry"]
-    geom_types = EXTRACTS[theme.lower()]["geom_types"]
     logger.info(f"Starting thematic extraction of {theme} objects...")
-
     with tempfile.TemporaryDirectory(prefix="geohealthaccess_") as tmpdir:
-
-        # Filter input .osm.pbf file and export to GeoJSON with osmium-tools
-        filtered = tags_filter(
-            osm_pbf, os.path.join(tmpdir, "filtered.osm.pbf"), expression
-        )
-
-        # Abort if .osm.pbf is empty
-        if _is_empty(filtered):
-            raise MissingDataError(
-                f"No {theme} features in {os.path.basename(osm_pbf)}."
-            )
-
-        # An intermediary GeoJSON file so that data can be loaded with GeoPandas
-        intermediary = to_geojson(
-            filtered, os.path.join(tmpdir, "intermediary.geojson")
-        )
-
-        # Drop useless columns
-        geodf = gpd.read_file(intermediary)
-        logger.info(f"Loaded OSM data into a GeoDataFrame with {len(geodf)} records.")
-        geodf = _filter_columns(geodf, properties)
-
-        # Convert Polygon or MultiPolygon features to Point
-        if theme == "health":
-            geodf["geometry"] = geodf.geometry.apply(_centroid)
-            logger.info("Converted Polygon and MultiPolygon to Point features.")
-
-        # Drop geometries of incorrect types
-        geodf = geodf[np.isin(geodf.geom_type, geom_types)]
-        logger.info(
-            f"Removed objects with invalid geom types ({len(geodf)} remaining)."
-        )
-
-        # Reset index, set CRS and save to output file
-        geodf = geodf.reset_index(drop=True)
-        if not geodf.crs:
-            geodf.crs = {"init": "epsg:4326"}
-        geodf.to_file(dst_fname, driver="GPKG")
-        dst_size = human_readable_size(os.path.getsize(dst_fname))
-        logger.info(
-            f"Saved thematric extract into {os.path.basename(dst_fname)} "
-            f"({dst_size})."
-        )
+        intermediary = _osmium_extract(osm_pbf, theme, tmpdir)
+        _save_extract(intermediary, theme, dst_fname)
 
     return dst_fname
 
@@ -405,21 +477,17 @@ def create_water_raster(
             water = water.to_crs(dst_crs)
 
         # Filter input features based on OSM `water` and `waterway` properties
-        water_bodies = water[water.water.isin(("lake", "basin", "reservoir", "lagoon"))]
-        large_rivers = water[(water.water == "river") | (water.waterway == "riverbank")]
-        small_rivers = water[water.waterway.isin(("river", "canal"))]
-        streams = water[water.waterway == "stream"]
-        features = [water_bodies, large_rivers, small_rivers]
+        # with a single boolean mask
+        water_bodies = water.water.isin(("lake", "basin", "reservoir", "lagoon"))
+        large_rivers = (water.water == "river") | (water.waterway == "riverbank")
+        small_rivers = water.waterway.isin(("river", "canal"))
+        mask = water_bodies | large_rivers | small_rivers
         if include_streams:
-            features.append(streams)
-
-        # Build a list of all input geometries as required by rasterio
-        geoms = []
-        for objects in features:
-            geoms += [g.__geo_interface__ for g in objects.geometry]
+            mask |= water.waterway == "stream"
+        geoms = water.geometry[mask]
         logger.info(f"Found {len(geoms)} OSM water objects.")
 
-        # Rasterize input features
+        # Rasterize all input features at once
         rst = rasterize(
             geoms,
             out_shape=dst_shape,
@@ -430,8 +498,9 @@ def create_water_raster(
             dtype="uint8",
         )
 
-        dst_profile = rasterio.default_gtiff_profile
-        dst_profile.update(
+        # A new profile is created as the module-level default profile of
+        # rasterio must not be modified
+        dst_profile = DefaultGTiffProfile(
             count=1,
             dtype="uint8",
             transform=dst_transform,
@@ -481,26 +550,56 @@ def extract_osm_objects(src_file, dst_dir, overwrite=False):
     # Source files are copied into a temporary directory where processed data
     # are also going to be stored.
     with tempfile.TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-        tmp_src_file = os.path.join(tmp_dir, os.path.basename(src_file))
-        storage.cp(src_file, tmp_src_file)
 
-        # Extract roads, health facilities, water objects and ferries
+        # Extract roads, health facilities, water objects and ferries, skipping
+        # themes whose destination file already exists
+        themes = []
         for theme in ("roads", "health", "water", "ferry"):
             dst_file = os.path.join(dst_dir, f"{theme}.gpkg")
-            tmp_dst_file = os.path.join(tmp_dir, os.path.basename(dst_file))
-
-            # Skip processing if destination file already exists
             if storage.exists(dst_file) and not overwrite:
                 logger.info(f"{os.path.basename(dst_file)} already exists. Skipping.")
                 continue
+            themes.append(theme)
+        if not themes:
+            return dst_dir
+
+        tmp_src_file = os.path.join(tmp_dir, os.path.basename(src_file))
+        storage.cp(src_file, tmp_src_file)
+
+        # Filter the source file once with the expressions of all themes so
+        # that each thematic extraction scans a much smaller file instead of
+        # the whole country
+        if len(themes) > 1:
+            tmp_src_file = tags_filter(
+                tmp_src_file,
+                os.path.join(tmp_dir, "filtered.osm.pbf"),
+                " ".join(EXTRACTS[theme]["expression"] for theme in themes),
+            )
 
-            # Extract objects and copy output file into destination directory
+        def osmium_extract(theme):
+            theme_dir = os.path.join(tmp_dir, theme)
+            os.makedirs(theme_dir)
             try:
-                thematic_extract(tmp_src_file, theme, tmp_dst_file)
-                storage.cp(tmp_dst_file, dst_file)
+                return _osmium_extract(tmp_src_file, theme, theme_dir)
             except MissingDataError:
                 logger.warning(
                     f"Skipping extraction of `{theme}` objects due to missing data."
                 )
+                return None
+
+        # Themes are independent and osmium runs in subprocesses, so filtering
+        # is done in parallel threads. GDAL is not thread-safe: GeoJSON exports
+        # are then loaded and saved one at a time.
+        logger.info(f"Starting thematic extraction of {', '.join(themes)} objects...")
+        with ThreadPoolExecutor(max_workers=len(themes)) as executor:
+            intermediaries = list(executor.map(osmium_extract, themes))
+
+        for theme, intermediary in zip(themes, intermediaries):
+            if not intermediary:
+                continue
+            dst_file = os.path.join(dst_dir, f"{theme}.gpkg")
+            tmp_dst_file = os.path.join(tmp_dir, os.path.basename(dst_file))
+            _save_extract(intermediary, theme, tmp_dst_file)
+            storage.cp(tmp_dst_file, dst_file)
 
     return dst_dir
@@ -1,5 +1,6 @@
 """Preprocessing of input data."""
 
+import functools
 import os
 import shutil
 from tempfile import TemporaryDirectory
@@ -29,6 +30,9 @@ GDAL_CO = [
     "ZLEVEL=6",
 ]
 
+# Memory available to gdalwarp for caching, in MB
+GDALWARP_WM = 512
+
 # GDAL data types supported for the GeoTIFF driver
 GDAL_DTYPES = [
     "Byte",
@@ -63,6 +67,22 @@ def _log_for_gdal_output(prefix=None):
     return _log
 
 
+# Default GeoTIFF compression options returned by `default_compression()`
+_INT_COMPRESSION = {
+    "compress": "deflate",
+    "predictor": 2,
+    "zlevel": 6,
+    "num_threads": "all_cpus",
+}
+_FLOAT_COMPRESSION = dict(_INT_COMPRESSION, predictor=3)
+
+
+@functools.lru_cache(maxsize=None)
+def _is_floating(dtype):
+    """Check if a data type is a floating point type."""
+    return np.issubdtype(np.dtype(dtype), np.floating)
+
+
 def default_compression(dtype):
     """Get default GeoTIFF compression options according to data type.
 
@@ -80,17 +100,9 @@ def default_compression(dtype):
     dict
         GeoTIFF driver compression options.
     """
-    options = {
-        "compress": "deflate",
-        "predictor": 2,
-        "zlevel": 6,
-        "num_threads": "all_cpus",
-    }
-    if isinstance(dtype, str):
-        dtype = np.dtype(dtype)
-    if np.issubdtype(dtype, np.floating):
-        options.update(predictor=3)
-    return options
+    if _is_floating(dtype):
+        return dict(_FLOAT_COMPRESSION)
+    return dict(_INT_COMPRESSION)
 
 
 def default_tiling():
@@ -230,6 +242,8 @@ def reproject(
         "-r",
         resampling_method,
     ]
+    # Multi-threaded warping: I/O and resampling are run in parallel threads
+    command += ["-multi", "-wo", "NUM_THREADS=ALL_CPUS", "-wm", str(GDALWARP_WM)]
     command += ["-tr", str(dst_res), str(dst_res)]  # spatial resolution
     command += ["-tap", "-te"] + [str(xy) for xy in dst_bounds]  # align to extent
     if overwrite:
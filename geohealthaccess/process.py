@@ -1,6 +1,5 @@
 """subprocess helpers"""
 
-import os
 import subprocess
 
 
@@ -12,9 +11,10 @@ def run(args, *, logger=None):
     """Run the provided command using subprocess.run, with sensible defaults,
     log if appropriate and return the CompletedSubprocess instance."""
     try:
+        # Output is collected by communicate() in bulk reads; the child
+        # inherits the current environment without copying it
         completed_process = subprocess.run(
             args,
-            env=os.environ.copy(),
             check=False,
             text=True,
             stdout=subprocess.PIPE,
@@ -22,12 +22,22 @@ References
 .. [1] `NASA EarthData Register <https://urs.earthdata.nasa.gov/users/new>`_
 """
 
+import atexit
+import functools
+import html
+import json
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
 from tempfile import TemporaryDirectory
+from urllib.parse import urlparse
 
 import geopandas as gpd
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+from appdirs import user_cache_dir
 from loguru import logger
 from pkg_resources import resource_filename
 from rasterio.crs import CRS
@@ -40,10 +50,108 @@ from geohealthaccess.preprocessing import (
     merge_tiles,
     reproject,
 )
-from geohealthaccess.utils import download_from_url, size_from_url
+from geohealthaccess.utils import download_from_url, http_session
 
 logger.disable("__name__")
 
+# Sizes of SRTM tiles cached on disk, and max. age of the cache in seconds
+SIZES_CACHE = os.path.join(user_cache_dir("geohealthaccess"), "srtm_sizes.json")
+SIZES_CACHE_MAX_AGE = 30 * 24 * 3600
+
+
+# The authenticity token is looked up with a single search for its input tag
+# instead of building a full DOM of the login page
+_TOKEN_INPUT = re.compile(
+    r"""<input\b[^>]*(?<![\w-])name\s*=\s*["']authenticity_token["'][^>]*>""",
+    re.IGNORECASE,
+)
+_VALUE_ATTRIBUTE = re.compile(
+    r"""(?<![\w-])value\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE
+)
+
+
+def _find_authenticity_token(page):
+    """Find authenticity token in the EarthData login page.
+
+    Parameters
+    ----------
+    page : str
+        HTML content of the EarthData homepage.
+
+    Returns
+    -------
+    token : str
+        Authenticity token.
+
+    Raises
+    ------
+    ValueError
+        If the token is not found in the page.
+    """
+    tag = _TOKEN_INPUT.search(page)
+    value = _VALUE_ATTRIBUTE.search(tag.group(0)) if tag else None
+    if not value or not (value.group(1) or value.group(2)):
+        raise ValueError("Token not found in EarthData login page.")
+    return html.unescape(value.group(1) or value.group(2))
+
+
+@functools.lru_cache(maxsize=1)
+def _sizes_cache():
+    """Load the sizes of SRTM tiles cached on disk.
+
+    The SRTM dataset does not change, so sizes are kept between runs instead of
+    sending a HEAD request per tile. Each entry stores the size of a tile with
+    the time it was requested, and entries older than `SIZES_CACHE_MAX_AGE`
+    seconds are dropped. New entries are written to disk once, at exit.
+
+    Returns
+    -------
+    dict
+        Size in bytes (`size`) and request timestamp (`time`) indexed by
+        tile name.
+    """
+    sizes = {}
+    try:
+        with open(SIZES_CACHE) as f:
+            cached = json.load(f)
+        oldest = time.time() - SIZES_CACHE_MAX_AGE
+        sizes = {
+            tile: entry
+            for tile, entry in cached.items()
+            if isinstance(entry, dict) and entry.get("time", 0) > oldest
+        }
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError) as e:
+        logger.debug(f"Cannot load cached sizes of SRTM tiles: {e}")
+    atexit.register(_save_sizes_cache, sizes, frozenset(sizes))
+    return sizes
+
+
+def _save_sizes_cache(sizes, loaded=frozenset()):
+    """Write the sizes of SRTM tiles to the cache file.
+
+    Nothing is written if no tile has been added since `loaded`.
+    """
+    if set(sizes) <= loaded:
+        return
+    try:
+        os.makedirs(os.path.dirname(SIZES_CACHE), exist_ok=True)
+        with open(SIZES_CACHE, "w") as f:
+            json.dump(sizes, f)
+    except OSError as e:
+        logger.debug(f"Cannot cache sizes of SRTM tiles: {e}")
+
+
+@functools.lru_cache(maxsize=1)
+def _tiles_index():
+    """Load the index of SRTM tiles from the resource file.
+
+    The GeoJSON file is only parsed once per process and the resulting
+    GeoDataFrame is shared by all `SRTM` instances.
+    """
+    return gpd.read_file(resource_filename(__name__, "resources/srtm.geojson"))
+
 
 class SRTM:
     """Access SRTM data."""
@@ -56,8 +164,16 @@ class SRTM:
         self.DOWNLOAD_URL = (
             "https://e4ftl01.cr.usgs.gov/MEASURES/SRTMGL1.003/2000.02.11/"
         )
-        self.sindex = self.spatial_index()
-        self.session = requests.Session()
+        # Keep enough connections alive for concurrent downloads
+        self.session = http_session(pool_maxsize=8)
+        self._sindex = None
+
+    @property
+    def sindex(self):
+        """Spatial index of SRTM tiles, loaded on first access."""
+        if self._sindex is None:
+            self._sindex = self.spatial_index()
+        return self._sindex
 
     @property
     def authenticity_token(self):
@@ -69,14 +185,7 @@ class SRTM:
             Authenticity token.
         """
         page = self.session.get(self.HOMEPAGE_URL).text
-        soup = BeautifulSoup(page, "html.parser")
-        token = ""
-        for element in soup.find_all("input"):
-            if element.attrs.get("name") == "authenticity_token":
-                token = element.attrs.get("value")
-        if not token:
-            raise ValueError("Token not found in EarthData login page.")
-        return token
+        return _find_authenticity_token(page)
 
     @property
     def logged_in(self):
@@ -112,7 +221,7 @@ class SRTM:
         payload = {
             "username": username,
             "password": password,
-            "authenticity_token": self.authenticity_token,
+            "authenticity_token": _find_authenticity_token(r.text),
         }
         r = self.session.post(self.LOGIN_URL, data=payload)
         r.raise_for_status()
@@ -128,7 +237,7 @@ class SRTM:
         geodataframe
             SRTM tiles spatial index.
         """
-        sindex = gpd.read_file(resource_filename(__name__, "resources/srtm.geojson"))
+        sindex = _tiles_index()
         logger.info(f"SRTM spatial index loaded ({len(sindex)} tiles).")
         return sindex
 
@@ -145,7 +254,10 @@ class SRTM:
         list of str
             List of SRTM tile filenames.
         """
-        tiles = self.sindex[self.sindex.intersects(geom)]
+        # Query the R-tree so that the predicate is only evaluated for the
+        # tiles whose bounding box intersects the area of interest
+        idx = self.sindex.sindex.query(geom, predicate="intersects")
+        tiles = self.sindex.iloc[np.sort(idx)]
         logger.info(f"{len(tiles)} SRTM tiles required to cover the area of interest.")
         return list(tiles.dataFile)
 
@@ -173,10 +285,68 @@ class SRTM:
             Path to outptut file.
         """
         url = self.DOWNLOAD_URL + tile
+        # Interrupted downloads of SRTM tiles are resumed where they stopped
         return download_from_url(
-            self.session, url, output_dir, show_progress, overwrite, pbar_position
+            self.session,
+            url,
+            output_dir,
+            show_progress,
+            overwrite,
+            pbar_position,
+            resume=True,
         )
 
+    def download_many(
+        self, tiles, output_dir, workers=6, show_progress=True, overwrite=False
+    ):
+        """Download multiple SRTM tiles concurrently.
+
+        Tiles are downloaded in a pool of threads sharing the authentified
+        session and its HTTP connections. EarthData limits the number of
+        concurrent connections per IP, so `workers` should not exceed 8.
+
+        Parameters
+        ----------
+        tiles : list of str
+            Tile names.
+        output_dir : str
+            Path to output directory.
+        workers : int, optional
+            Max. number of concurrent downloads. Default=6.
+        show_progress : bool, optional
+            Show download progress bars.
+        overwrite : bool, optional
+            Force overwrite of existing files.
+
+        Returns
+        -------
+        list of str
+            Paths to output files, in the same order as `tiles`.
+        """
+        storage.mkdir(output_dir)
+
+        # Each running download holds one progress bar position and gives it
+        # back when done, so that concurrent bars never share a line
+        positions = Queue()
+        for position in range(workers):
+            positions.put(position)
+
+        def task(tile):
+            position = positions.get()
+            try:
+                return self.download(
+                    tile,
+                    output_dir,
+                    show_progress=show_progress,
+                    overwrite=overwrite,
+                    pbar_position=position,
+                )
+            finally:
+                positions.put(position)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(task, tiles))
+
     def download_size(self, tile):
         """Get download size of a SRTM tile.
 
@@ -187,11 +357,30 @@ class SRTM:
 
         Returns
         -------
-        int
-            Size in bytes.
+        int or None
+            Size in bytes. None if the server does not report it.
         """
+        sizes = _sizes_cache()
+        if tile in sizes:
+            return sizes[tile]["size"]
+
         url = self.DOWNLOAD_URL + tile
-        return size_from_url(self.session, url)
+        r = self.session.head(
+            url, allow_redirects=True, headers={"Accept-Encoding": "identity"}
+        )
+        r.raise_for_status()
+        size = r.headers.get("Content-Length")
+        if not size:
+            logger.debug(f"Size of SRTM tile {tile} is not reported.")
+            return None
+        size = int(size)
+
+        # Without a valid session, the request ends on the EarthData login
+        # page, whose size must not be cached
+        data_host = urlparse(self.DOWNLOAD_URL).netloc
+        if r.status_code == 200 and urlparse(r.url).netloc == data_host:
+            sizes[tile] = {"size": size, "time": time.time()}
+        return size
 
 
 def preprocess(src_dir, dst_elev, dst_slope, dst_crs, dst_res, geom, overwrite=False):
@@ -1,8 +1,10 @@
 """Access, read and write data from cloud storage."""
 
+import functools
 import os
 import shutil
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from glob import glob as local_glob
 from tempfile import TemporaryDirectory
@@ -15,6 +17,16 @@ from tqdm import tqdm
 
 logger.disable(__name__)
 
+# Max. number of concurrent file transfers
+MAX_WORKERS = 8
+
+# Max. number of connections kept open to S3
+S3_MAX_POOL_CONNECTIONS = 50
+
+# Persistent subdirectories of the user cache directory, which are not
+# removed by clean_cache_dir()
+PERSISTENT_CACHE_DIRS = ("downloads",)
+
 
 try:
     import gcsfs
@@ -32,26 +44,30 @@ except ImportError:
 
 
 class Location:
-    def __init__(self, path):
-        """Parsed location string (file path or S3/GCS URL)."""
-        self._raw_path = path
+    """Parsed location string (file path or S3/GCS URL).
 
-    @property
-    def protocol(self):
-        """Return protocol of a location."""
-        parsed_url = self._raw_path.split("://")
-        if len(parsed_url) == 1:
-            return "local"
-        else:
-            return parsed_url[0]
+    The location is parsed once, when the object is created.
+
+    Attributes
+    ----------
+    protocol : str
+        Protocol of the location ("local" for file paths).
+    path : str
+        Location path (without scheme/protocol).
+    """
 
-    @property
-    def path(self):
-        """Return location path (without scheme/protocol)."""
-        if self.protocol == "local":
-            return self._raw_path
+    __slots__ = ("_raw_path", "protocol", "path")
+
+    def __init__(self, path):
+        """Parse a location string."""
+        self._raw_path = path
+        protocol, sep, location_path = path.partition("://")
+        if sep:
+            self.protocol = protocol
+            self.path = location_path
         else:
-            return self._raw_path.split("://")[-1]
+            self.protocol = "local"
+            self.path = path
 
     def __str__(self):
         return self._raw_path
@@ -73,10 +89,21 @@ def get_s3fs():
     """
     if not has_s3fs:
         raise ImportError("s3fs library is required when using s3 urls.")
+    return _s3fs(os.getenv("S3_ENDPOINT_URL"))
+
+
+@functools.lru_cache(maxsize=None)
+def _s3fs(endpoint_url):
+    """Create a S3 filesystem for a given endpoint.
+
+    The filesystem, and its pool of connections, is shared by all storage
+    operations instead of being initialized for each of them.
+    """
     return s3fs.S3FileSystem(
         client_kwargs={
-            "endpoint_url": os.getenv("S3_ENDPOINT_URL"),
+            "endpoint_url": endpoint_url,
         },
+        config_kwargs={"max_pool_connections": S3_MAX_POOL_CONNECTIONS},
     )
 
 
@@ -256,27 +283,64 @@ def mkdir(path):
         os.makedirs(location.path, exist_ok=True)
 
 
-def size(path):
-    """Get size of a file in bytes."""
-    logger.debug(f"Getting size of file {path}")
-    if not exists(path):
-        raise FileNotFoundError(f"No file found at {path}.")
+def _stat(path):
+    """Get size and Last Modified Time of a file in a single request.
+
+    Parameters
+    ----------
+    path : str
+        Path or URL to the file.
 
+    Returns
+    -------
+    dict or None
+        File size in bytes (`size`) and Last Modified Time as a python
+        datetime (`mtime`). None if the file does not exist.
+    """
     location = Location(path)
 
     if location.protocol == "local":
-        return os.path.getsize(location.path)
+        try:
+            stat = os.stat(location.path)
+        except FileNotFoundError:
+            return None
+        tz = dateutil.tz.tzlocal()
+        return {
+            "size": stat.st_size,
+            "mtime": datetime.fromtimestamp(stat.st_mtime, tz=tz),
+        }
 
     elif location.protocol == "s3":
         fs = get_s3fs()
-        return fs.size(location.path)
+        try:
+            info = fs.info(location.path)
+        except FileNotFoundError:
+            return None
+        return {"size": info.get("size"), "mtime": info.get("LastModified")}
 
     elif location.protocol == "gcs":
         fs = get_gcsfs()
-        return fs.size(location.path)
+        try:
+            info = fs.info(location.path)
+        except FileNotFoundError:
+            return None
+        updated = info.get("updated")
+        return {
+            "size": info.get("size"),
+            "mtime": dateutil.parser.parse(updated) if updated else None,
+        }
 
     else:
-        raise IOError(f"size for {location} is not supported.")
+        raise IOError(f"stat for {location} is not supported.")
+
+
+def size(path):
+    """Get size of a file in bytes."""
+    logger.debug(f"Getting size of file {path}")
+    stat = _stat(path)
+    if stat is None:
+        raise FileNotFoundError(f"No file found at {path}.")
+    return stat["size"]
 
 
 def mtime(path):
@@ -288,23 +352,10 @@ def mtime(path):
         Last Modified Time as a python datetime.
     """
     logger.debug(f"Getting mtime of {path}")
-    if not exists(path):
+    stat = _stat(path)
+    if stat is None:
         raise FileNotFoundError(f"No file found at {path}.")
-    location = Location(path)
-
-    if location.protocol == "local":
-        mtime = os.path.getmtime(location.path)
-        tz = dateutil.tz.tzlocal()
-        return datetime.fromtimestamp(mtime, tz=tz)
-    elif location.protocol == "s3":
-        fs = get_s3fs()
-        return fs.info(location.path).get("LastModified")
-    elif location.protocol == "gcs":
-        fs = get_gcsfs()
-        info = fs.info(location.path)
-        return dateutil.parser.parse(info.get("updated"))
-    else:
-        raise IOError(f"mtime for {path} is not supported.")
+    return stat["mtime"]
 
 
 def glob(pattern):
@@ -379,28 +430,58 @@ def unzip(src_file_path, dst_dir_path):
         else:
             raise IOError(f"unzip for {src_file_location} is not supported.")
 
-        for f in os.listdir(tmp_dir):
-            cp(os.path.join(tmp_dir, f), os.path.join(dst_dir_path, f))
+        # Extracted files are independent from each other: they are copied
+        # concurrently, which pays off when the destination is remote
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [
+                executor.submit(
+                    cp, os.path.join(tmp_dir, f), os.path.join(dst_dir_path, f)
+                )
+                for f in os.listdir(tmp_dir)
+            ]
+            for future in futures:
+                future.result()
 
 
 def find(path):
     """List all files in a directory recursively."""
+    return list(_find_sizes(path))
+
+
+def _find_sizes(path):
+    """List all files in a directory recursively, with their sizes.
+
+    Remote file sizes are read from the listing itself instead of being
+    requested file by file.
+
+    Returns
+    -------
+    dict
+        File sizes in bytes indexed by file path.
+    """
     loc = Location(path)
     logger.debug(f"Finding all files at {path}")
     if loc.protocol == "local":
-        files = []
+        files = {}
         for dir_, _, ls in os.walk(loc.path):
             for f in ls:
-                files.append(os.path.abspath(os.path.join(dir_, f)))
+                fp = os.path.abspath(os.path.join(dir_, f))
+                files[fp] = os.path.getsize(fp)
         return files
     elif loc.protocol == "s3":
         fs = get_s3fs()
-        return [f"s3://{p}" for p in fs.find(loc.path)]
+        return {
+            f"s3://{p}": info.get("size")
+            for p, info in fs.find(loc.path, detail=True).items()
+        }
     elif loc.protocol == "gcs":
         fs = get_gcsfs()
-        return [f"gcs://{p}" for p in fs.find(loc.path)]
+        return {
+            f"gcs://{p}": info.get("size")
+            for p, info in fs.find(loc.path, detail=True).items()
+        }
     else:
-        raise IOError(f"find for {path.protocol} is not supported.")
+        raise IOError(f"find for {loc.protocol} is not supported.")
 
 
 def is_local(path):
@@ -409,18 +490,25 @@ def is_local(path):
     return loc.protocol == "local"
 
 
-def _check_sizes(src_path, dst_path):
-    """Check if src and dst file sizes are equal."""
-    if not exists(dst_path):
+def _check_sizes(src_path, dst_path, src_size=None):
+    """Check if src and dst file sizes are equal.
+
+    The size of the source file is not requested if `src_size` is provided.
+    """
+    dst_stat = _stat(dst_path)
+    if dst_stat is None:
         return False
-    return size(src_path) == size(dst_path)
+    if src_size is None:
+        src_size = size(src_path)
+    return src_size == dst_stat["size"]
 
 
 def _check_mtimes(src_path, dst_path):
     """Check if src is more recent than dst file."""
-    if not exists(dst_path):
+    dst_stat = _stat(dst_path)
+    if dst_stat is None:
         return False
-    return mtime(src_path) > mtime(dst_path)
+    return mtime(src_path) > dst_stat["mtime"]
 
 
 def _no_ending_slash(path):
@@ -431,7 +519,56 @@ def _no_ending_slash(path):
         return path
 
 
-def recursive_download(remote_dir, local_dir, show_progress=False, overwrite=False):
+def _sync_file(src_path, dst_path, src_size, overwrite=False):
+    """Copy a file unless a file with an identical size already exists.
+
+    Returns
+    -------
+    int
+        Size of the source file in bytes.
+    """
+    logger.debug(f"{src_path} > {dst_path}")
+    if overwrite or not _check_sizes(src_path, dst_path, src_size=src_size):
+        mkdir(os.path.dirname(dst_path))
+        cp(src_path, dst_path)
+    return src_size
+
+
+def _sync_files(files, show_progress=False, overwrite=False, max_workers=MAX_WORKERS):
+    """Copy files concurrently.
+
+    Parameters
+    ----------
+    files : list of tuple
+        Source path, destination path and size of the source file in bytes
+        for each file.
+    show_progress : bool, optional
+        Show transfer progress bar.
+    overwrite : bool, optional
+        Overwrite existing files.
+    max_workers : int, optional
+        Max. number of concurrent file transfers.
+    """
+    total = sum(f_size for _, _, f_size in files)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_sync_file, src, dst, f_size, overwrite)
+            for src, dst, f_size in files
+        ]
+        with tqdm(
+            total=total,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+            disable=not show_progress,
+        ) as pbar:
+            for future in as_completed(futures):
+                pbar.update(future.result())
+
+
+def recursive_download(
+    remote_dir, local_dir, show_progress=False, overwrite=False, max_workers=MAX_WORKERS
+):
     """Download contents from remote_dir into local_dir.
 
     Existing files with identical sizes are not downloaded unless overwrite is
@@ -447,6 +584,8 @@ def recursive_download(remote_dir, local_dir, show_progress=False, overwrite=Fal
         Show download progress bar.
     overwrite : bool, optional
         Overwrite existing files.
+    max_workers : int, optional
+        Max. number of concurrent file transfers.
 
     Raises
     ------
@@ -458,28 +597,18 @@ def recursive_download(remote_dir, local_dir, show_progress=False, overwrite=Fal
 
     logger.debug(f"Recursive download from {remote_dir} to {local_dir}")
 
-    remote_files = find(remote_dir)
-
-    if show_progress:
-        total = sum([size(f) for f in remote_files])
-        pbar = tqdm(total=total, unit="B", unit_scale=True, unit_divisor=1024)
-
-    for f_remote in remote_files:
-        f_local = f_remote.replace(remote_dir, local_dir)
-        logger.debug(f"{f_remote} > {f_local}")
-        if overwrite or not _check_sizes(f_remote, f_local):
-            dir_ = os.path.dirname(f_local)
-            if not os.path.exists(dir_):
-                os.makedirs(dir_)
-            cp(f_remote, f_local)
-        if show_progress:
-            pbar.update(size(f_remote))
+    # Remote file sizes come with the listing
+    remote_files = _find_sizes(remote_dir)
+    files = [
+        (f_remote, f_remote.replace(remote_dir, local_dir), f_size)
+        for f_remote, f_size in remote_files.items()
+    ]
+    _sync_files(files, show_progress, overwrite, max_workers)
 
-    if show_progress:
-        pbar.close()
 
-
-def recursive_upload(local_dir, remote_dir, show_progress=False, overwrite=False):
+def recursive_upload(
+    local_dir, remote_dir, show_progress=False, overwrite=False, max_workers=MAX_WORKERS
+):
     """Upload contents from local_dir into remote_dir.
 
     Existing files with identical sizes are not uploaded unless overwrite is
@@ -495,52 +624,63 @@ def recursive_upload(local_dir, remote_dir, show_progress=False, overwrite=False
         Show download progress bar.
     overwrite : bool, optional
         Overwrite existing files.
+    max_workers : int, optional
+        Max. number of concurrent file transfers.
     """
     remote_dir = _no_ending_slash(remote_dir)
     local_dir = _no_ending_slash(local_dir)
 
     logger.debug(f"Recursive upload from {local_dir} to {remote_dir}")
 
-    local_files = []
-    for dir_, _, files in os.walk(local_dir):
-        for f in files:
+    files = []
+    for dir_, _, fnames in os.walk(local_dir):
+        for f in fnames:
             # ignore .aux.xml files sometimes created when opening
             # a GeoTIFF raster in QGIS.
             if not f.endswith(".aux.xml"):
-                local_files.append(os.path.join(dir_, f))
+                f_local = os.path.join(dir_, f)
+                f_remote = f_local.replace(local_dir, remote_dir)
+                files.append((f_local, f_remote, os.path.getsize(f_local)))
+
+    _sync_files(files, show_progress, overwrite, max_workers)
 
-    if show_progress:
-        total_size = sum([os.path.getsize(f) for f in local_files])
-        pbar = tqdm(total=total_size, unit="B", unit_scale=True, unit_divisor=1024)
 
-    for f_local in local_files:
-        f_remote = f_local.replace(local_dir, remote_dir)
-        logger.debug(f"{f_local} > {f_remote}")
-        if overwrite or not _check_sizes(f_local, f_remote):
-            cp(f_local, f_remote)
-        if show_progress:
-            pbar.update(size(f_local))
+def _latest_mtime(directory):
+    """Get the most recent modification timestamp of files in a directory.
 
-    if show_progress:
-        pbar.close()
+    The directory tree is walked with `os.scandir()` so that file attributes
+    are read from the directory entries. Returns 0 if there is no file.
+    """
+    latest = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                latest = max(latest, _latest_mtime(entry.path))
+            else:
+                latest = max(latest, entry.stat(follow_symlinks=False).st_mtime)
+    return latest
 
 
 def clean_cache_dir(max_hours=24):
     """Remove old cache directories if they still exist.
 
+    A directory is removed if none of its files has been modified for
+    `max_hours`. Persistent caches listed in `PERSISTENT_CACHE_DIRS`, such as
+    partial and conditional downloads, are kept.
+
     Parameters
     ----------
     max_hours : int, optional
         Max. age of cache directory in hours.
     """
-    for cache_dir in os.listdir(user_cache_dir("geohealthaccess")):
-        cache_dir = os.path.join(user_cache_dir("geohealthaccess"), cache_dir)
-        mtimes = []
-        for dir_, _, files in os.walk(cache_dir):
-            for f in files:
-                mtimes.append(mtime(os.path.join(dir_, f)))
-        if (
-            datetime.now() - max(mtimes).replace(tzinfo=None)
-        ).seconds >= max_hours * 3600:
+    with os.scandir(user_cache_dir("geohealthaccess")) as entries:
+        cache_dirs = [
+            entry.path
+            for entry in entries
+            if entry.is_dir() and entry.name not in PERSISTENT_CACHE_DIRS
+        ]
+    now = datetime.now().timestamp()
+    for cache_dir in cache_dirs:
+        if now - _latest_mtime(cache_dir) >= max_hours * 3600:
             logger.debug(f"Removing cache directory {cache_dir}")
             shutil.rmtree(cache_dir)
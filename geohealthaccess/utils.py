@@ -1,23 +1,35 @@
 """Utility functions."""
 
+import functools
+import hashlib
 import json
 import os
+import shutil
 from tempfile import TemporaryDirectory
 import zipfile
 from urllib.parse import urlparse
 import random
 import string
 
+import requests
+from appdirs import user_cache_dir
 from loguru import logger
 from pkg_resources import resource_string
+from requests.adapters import HTTPAdapter
 from shapely.geometry import shape
 from tqdm.auto import tqdm
+from urllib3.util.retry import Retry
 
 from geohealthaccess import storage
 
-
 logger.disable("__name__")
 
+# Size of the chunks read from HTTP response streams (64 KiB)
+CHUNK_SIZE = 1 << 16
+
+# Size of the buffer used to copy files extracted from archives (1 MiB)
+UNZIP_BUFFER_SIZE = 1 << 20
+
 
 def human_readable_size(size, decimals=1):
     """Transform size in bytes into human readable text."""
@@ -28,6 +40,34 @@ def human_readable_size(size, decimals=1):
     return f"{size:.{decimals}f} {unit}"
 
 
+def http_session(pool_maxsize=10, max_retries=3):
+    """Initialize a requests session with a pool of keep-alive connections.
+
+    Failed connections are retried with an exponential backoff.
+
+    Parameters
+    ----------
+    pool_maxsize : int, optional
+        Max. number of connections kept alive per host. Should be at least
+        the number of threads sharing the session. Default=10.
+    max_retries : int, optional
+        Max. number of retries per request. Default=3.
+
+    Returns
+    -------
+    session : requests.Session
+        HTTP session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=max_retries, backoff_factor=0.2),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def size_from_url(session, url):
     """Get size of a distant file based on HTTP headers.
 
@@ -48,39 +88,248 @@ def size_from_url(session, url):
     return int(content_length)
 
 
-def http_same_size(session, url, fname):
-    """Compare local and remote sizes of a file.
+def country_geometry(country):
+    """Get the shapely geometry corresponding to a given country
+    identified by its name or its three-letters ISO A3 Code.
 
-    Parameters
-    ----------
-    session : requests session"osmium" "citation" "openstreetmap"
-        An initialized requests session object.
-    url : str
-        URL of the file.
-    fname : str
-        Path to local file.
+    Geometries are cached in memory so that the countries resource file is
+    not parsed again.
     """
-    if not os.path.isfile(fname):
-        return False
-    remote_size = size_from_url(session, url)
-    local_size = storage.size(fname)
-    return remote_size == local_size
+    return _country_geometry(country.lower())
 
 
-def country_geometry(country):
-    """Get the shapely geometry corresponding to a given country
-    identified by its name or its three-letters ISO A3 Code.
+@functools.lru_cache(maxsize=None)
+def _country_geometry(country):
+    """Get country geometry from the resource file."""
+    geometry = _countries().get(country)
+    if not geometry:
+        raise ValueError("Country not found.")
+    return shape(geometry)
+
+
+@functools.lru_cache(maxsize=None)
+def _countries():
+    """Index GeoJSON geometries of the countries resource file.
+
+    The file is only parsed once. Geometries are indexed by lowercase country
+    name and ISO A3 code, and parsed into shapely objects on demand.
     """
     countries = json.loads(resource_string(__name__, "resources/countries.geojson"))
-    geom = None
+    index = {}
     for feature in countries["features"]:
         name = feature["properties"]["ADMIN"]
         code = feature["properties"]["ISO_A3"]
-        if country.lower() in (name.lower(), code.lower()):
-            geom = shape(feature["geometry"])
-    if not geom:
-        raise ValueError("Country not found.")
-    return geom
+        index[name.lower()] = feature["geometry"]
+        index[code.lower()] = feature["geometry"]
+    return index
+
+
+def _download_cache_path(url, dst_file):
+    """Get base path of the cached download metadata of a remote file.
+
+    Paths are keyed on a hash of both the URL and the local destination, so
+    that files sharing a basename never share cached data.
+    """
+    key = hashlib.sha256(f"{url}\n{dst_file}".encode()).hexdigest()
+    return os.path.join(user_cache_dir("geohealthaccess"), "downloads", key)
+
+
+def _load_validators(cache_path):
+    """Load the HTTP validators stored after a previous download.
+
+    Returns
+    -------
+    dict
+        Server `etag` and `last_modified` values, and `size` of the local
+        copy once the download has completed. Empty if nothing is stored.
+    """
+    try:
+        with open(cache_path + ".json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_validators(cache_path, response, **kwargs):
+    """Store the HTTP validators of a response in the cache directory."""
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        **kwargs,
+    }
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path + ".json", "w") as f:
+            json.dump(validators, f)
+    except OSError as e:
+        logger.debug(f"Cannot store HTTP validators: {e}")
+
+
+def _conditional_headers(validators, dst_file):
+    """Build HTTP headers to only download a file if it has been modified.
+
+    The entity tag and the Last-Modified date sent by the server for the
+    previous download are sent back in `If-None-Match` and
+    `If-Modified-Since`, as long as the local copy is the one that was
+    downloaded.
+
+    Parameters
+    ----------
+    validators : dict
+        HTTP validators stored after the previous download.
+    dst_file : str
+        Path to the local copy of the remote file.
+
+    Returns
+    -------
+    headers : dict
+        Conditional request headers.
+    """
+    headers = {}
+    if not validators.get("size") or validators["size"] != storage.size(dst_file):
+        return headers
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _range_headers(part_file, validators):
+    """Build HTTP headers to resume an interrupted download.
+
+    The range request is sent with an `If-Range` validator, so that the
+    server sends the whole file again if it has changed since the partial
+    download started. Downloads are not resumed without a validator.
+
+    Returns
+    -------
+    offset : int
+        Size of the partial download in bytes.
+    headers : dict
+        Range request headers.
+    """
+    if not os.path.isfile(part_file):
+        return 0, {}
+    offset = os.path.getsize(part_file)
+    etag = validators.get("etag")
+    if etag and not etag.startswith("W/"):
+        validator = etag
+    else:
+        validator = validators.get("last_modified")
+    if not offset or not validator:
+        return 0, {}
+    return offset, {"Range": f"bytes={offset}-", "If-Range": validator}
+
+
+def _request_headers(cache_path, dst_file, local_copy, resume):
+    """Build the headers of a download request.
+
+    Returns
+    -------
+    offset : int
+        Byte at which the requested data starts.
+    headers : dict
+        Request headers.
+    """
+    # Ask for an uncompressed response so that Content-Length can be compared
+    # with the size of the local file
+    headers = {"Accept-Encoding": "identity"}
+    validators = _load_validators(cache_path)
+    offset = 0
+    if local_copy:
+        headers.update(_conditional_headers(validators, dst_file))
+    elif resume:
+        # Only ask for the missing bytes if a previous download was interrupted
+        offset, range_headers = _range_headers(cache_path + ".part", validators)
+        headers.update(range_headers)
+    return offset, headers
+
+
+def _resume_offset(response, offset):
+    """Get the byte at which the data of a response starts.
+
+    Returns `offset` if the response continues a partial download, 0 if the
+    server sent the whole file (because it has changed or does not support
+    range requests), and None if the partial download cannot be resumed.
+    """
+    if not offset or response.status_code not in (206, 416):
+        return 0
+    content_range = response.headers.get("Content-Range", "")
+    if response.status_code == 206 and content_range.startswith(f"bytes {offset}-"):
+        return offset
+    return None
+
+
+def _response_size(response, offset):
+    """Get the size of the whole remote file from the response headers."""
+    size = response.headers.get("Content-Length")
+    if size:
+        return int(size) + offset
+    return None
+
+
+def _is_up_to_date(dst_file, size, overwrite):
+    """Check if a local copy has the expected size, or remove it if overwrite."""
+    if not storage.exists(dst_file):
+        return False
+    if overwrite:
+        logger.info(f"Removing old {os.path.basename(dst_file)} file.")
+        storage.rm(dst_file)
+        return False
+    return size == storage.size(dst_file)
+
+
+def _progress_bar(filename, size, offset, position):
+    """Initialize the progress bar of a download."""
+    return tqdm(
+        desc=filename,
+        bar_format="{desc} | {percentage:3.0f}% | {rate_fmt}",
+        total=size,
+        unit_scale=True,
+        unit="B",
+        leave=True,
+        position=position,
+        initial=offset,
+    )
+
+
+def _write_response(response, f, chunk_size, progress_bar=None):
+    """Write the streamed content of a response to a file object."""
+    # iter_content() hands out the chunks yielded by urllib3's raw.stream()
+    # as they are, without re-slicing them
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if chunk:
+            f.write(chunk)
+            if progress_bar:
+                progress_bar.update(len(chunk))
+
+
+def _save_response(
+    response, dst_file, cache_path, offset, resume, chunk_size, progress_bar=None
+):
+    """Save the content of a response to `dst_file`.
+
+    With `resume`, data is appended to a partial file in the cache directory,
+    which is only removed once the download has completed. The validators of
+    the response are then stored for the next conditional request.
+    """
+    if resume:
+        part_file = cache_path + ".part"
+        if not offset:
+            # Validators of the partial data, sent back in If-Range
+            _save_validators(cache_path, response)
+        with open(part_file, "ab" if offset else "wb") as f:
+            _write_response(response, f, chunk_size, progress_bar)
+        storage.cp(part_file, dst_file)
+        os.remove(part_file)
+    else:
+        with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
+            tmp_file = os.path.join(tmp_dir, os.path.basename(dst_file))
+            with open(tmp_file, "wb") as f:
+                _write_response(response, f, chunk_size, progress_bar)
+            storage.cp(tmp_file, dst_file)
+    _save_validators(cache_path, response, size=storage.size(dst_file))
 
 
 def download_from_url(
@@ -91,6 +340,8 @@ def download_from_url(
     overwrite=False,
     pbar_position=0,
     timeout=30,
+    chunk_size=CHUNK_SIZE,
+    resume=False,
 ):
     """Download remote file from URL in a given requests session.
 
@@ -111,6 +362,11 @@ def download_from_url(
         threads display a progress bar simultaneously.
     timeout : int, optional (default=30)
         GET request timeout in seconds.
+    chunk_size : int, optional (default=CHUNK_SIZE)
+        Size in bytes of the chunks read from the response stream.
+    resume : bool, optional (default=False)
+        Keep partially downloaded data in the cache directory and resume
+        interrupted downloads with an HTTP range request.
 
     Returns
     -------
@@ -120,57 +376,55 @@ def download_from_url(
     storage.mkdir(output_dir)
     filename = url.split("/")[-1]
     dst_file = os.path.join(output_dir, filename)
-
-    with session.get(url, stream=True, timeout=timeout) as r:
-
-        try:
-            r.raise_for_status()
-        except Exception as e:
-            logger.error(e)
-
-        # Remove old file if overwrite
-        if storage.exists(dst_file) and overwrite:
-            logger.info(f"Removing old {filename} file.")
-            storage.rm(dst_file)
-
-        # Skip download if remote and local sizes are equal
-        if http_same_size(session, url, dst_file):
-            logger.info(
-                f"Remote and local sizes of {filename} are equal. Skipping download."
+    cache_path = _download_cache_path(url, dst_file)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    local_copy = not overwrite and storage.exists(dst_file)
+
+    while True:
+        offset, headers = _request_headers(cache_path, dst_file, local_copy, resume)
+        with session.get(url, stream=True, timeout=timeout, headers=headers) as r:
+
+            # The server does not send the file again if it has not changed
+            if r.status_code == 304:
+                logger.info(f"Remote {filename} has not been modified. Skipping.")
+                return dst_file
+
+            # Partial data cannot be resumed: start again from scratch
+            offset = _resume_offset(r, offset)
+            if offset is None:
+                logger.info(f"Cannot resume download of {filename}. Restarting.")
+                os.remove(cache_path + ".part")
+                continue
+            if offset:
+                logger.info(f"Resuming download of {filename} at byte {offset}.")
+
+            try:
+                r.raise_for_status()
+            except Exception as e:
+                logger.error(e)
+
+            # Remote size is read from the headers of the streamed response
+            # instead of sending an additional HEAD request
+            size = _response_size(r, offset)
+            if _is_up_to_date(dst_file, size, overwrite):
+                logger.info(
+                    f"Remote and local sizes of {filename} are equal. Skipping."
+                )
+                return dst_file
+
+            progress_bar = None
+            if show_progress:
+                progress_bar = _progress_bar(filename, size, offset, pbar_position)
+            _save_response(
+                r, dst_file, cache_path, offset, resume, chunk_size, progress_bar
             )
-            return dst_file
+            if progress_bar:
+                progress_bar.n = size or progress_bar.n
+                progress_bar.close()
 
-        # Setup progress bar
-        if show_progress:
-            size = int(r.headers.get("Content-Length"))
-            bar_format = "{desc} | {percentage:3.0f}% | {rate_fmt}"
-            progress_bar = tqdm(
-                desc=filename,
-                bar_format=bar_format,
-                total=size,
-                unit_scale=True,
-                unit="B",
-                leave=True,
-                position=pbar_position,
-            )
-
-        with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-            tmp_file = os.path.join(tmp_dir, filename)
-            with open(tmp_file, "wb") as f:
-                for chunk in r.iter_content(chunk_size=1024):
-                    if chunk:
-                        f.write(chunk)
-                        if show_progress:
-                            progress_bar.update(1024)
-            storage.cp(tmp_file, dst_file)
-        if show_progress:
-            progress_bar.n = progress_bar.total
-            progress_bar.close()
-
-    filesize = human_readable_size(storage.size(dst_file))
-    logger.info(f"Downloaded file {filename} ({filesize}).")
-
-    return dst_file
+        filesize = human_readable_size(storage.size(dst_file))
+        logger.info(f"Downloaded file {filename} ({filesize}).")
+        return dst_file
 
 
 def download_from_ftp(ftp, url, output_dir, show_progress=True, overwrite=False):
@@ -261,22 +515,52 @@ def size_from_ftp(ftp, url):
     return ftp.size(url.path)
 
 
+def _member_path(dst_dir, name):
+    """Get output path of an archive member.
+
+    Absolute paths and parent directory references are dropped, as in
+    `zipfile.ZipFile.extract()`, so that members are always extracted
+    inside `dst_dir`.
+    """
+    parts = [part for part in name.split("/") if part not in ("", ".", "..")]
+    return os.path.join(dst_dir, *parts)
+
+
 def unzip(src, dst_dir=None):
-    """Extract a .zip archive."""
+    """Extract a .zip archive.
+
+    Members are copied with a large buffer, and those already extracted
+    with the same size are skipped.
+    """
     if not dst_dir:
         dst_dir = os.path.dirname(src)
     with zipfile.ZipFile(src, "r") as z:
-        z.extractall(dst_dir)
+        for info in z.infolist():
+            dst_file = _member_path(dst_dir, info.filename)
+            if info.is_dir():
+                os.makedirs(dst_file, exist_ok=True)
+                continue
+            try:
+                if os.path.getsize(dst_file) == info.file_size:
+                    logger.debug(f"{info.filename} already extracted. Skipping.")
+                    continue
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+            with z.open(info) as f_src, open(dst_file, "wb") as f_dst:
+                shutil.copyfileobj(f_src, f_dst, length=UNZIP_BUFFER_SIZE)
     return dst_dir
 
 
 def unzip_all(src_dir, remove_archives=False):
     """Unzip all .zip files in a directory."""
-    filenames = os.listdir(src_dir)
-    filenames = [f for f in filenames if f.endswith(".zip")]
+    with os.scandir(src_dir) as entries:
+        filenames = [
+            entry.path
+            for entry in entries
+            if entry.name.endswith(".zip") and entry.is_file()
+        ]
     progress = tqdm(total=len(filenames))
     for filename in filenames:
-        filename = os.path.join(src_dir, filename)
         unzip(filename)
         if remove_archives:
             os.remove(filename)
@@ -5,11 +5,11 @@ Notes
 See `<https://www.worldpop.org/>`_ for more information about the WorldPop project.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 
 from loguru import logger
-import requests
 
-from geohealthaccess.utils import download_from_url
+from geohealthaccess.utils import download_from_url, http_session
 
 
 logger.disable("__name__")
@@ -42,7 +42,13 @@ def build_url(country, year=2020, un_adj=False):
 
 
 def download(
-    country, output_dir, year=2020, un_adj=False, show_progress=True, overwrite=False
+    country,
+    output_dir,
+    year=2020,
+    un_adj=False,
+    show_progress=True,
+    overwrite=False,
+    session=None,
 ):
     """Download a WorldPop population dataset.
 
@@ -60,6 +66,9 @@ def download(
         Show progress bar. Default=False.
     overwrite : bool, optional
         Overwrite existing files. Default=True.
+    session : requests.Session, optional
+        Session used to reuse HTTP connections between downloads. A new one
+        is created if not provided.
 
     Returns
     -------
@@ -68,8 +77,66 @@ def download(
     """
     url = build_url(country, year=year, un_adj=un_adj)
     logger.info(f"Downloading population counts from {url}.")
-    with requests.Session() as s:
+    if session:
+        return download_from_url(
+            session, url, output_dir, show_progress=show_progress, overwrite=overwrite
+        )
+    with http_session() as s:
         fp = download_from_url(
             s, url, output_dir, show_progress=show_progress, overwrite=overwrite
         )
     return fp
+
+
+def download_many(
+    jobs,
+    output_dir,
+    un_adj=False,
+    workers=4,
+    show_progress=False,
+    overwrite=False,
+):
+    """Download multiple WorldPop population datasets concurrently.
+
+    Downloads run in a pool of threads sharing a single session, so that
+    connections to the server are kept alive from one file to another. The
+    number of workers should stay low to avoid hitting the connection limit
+    of the server.
+
+    Parameters
+    ----------
+    jobs : list of tuple
+        (country, year) pairs, with country as an ISO A3 code.
+    output_dir : str
+        Path to output directory.
+    un_adj : bool, optional
+        Use UN adjusted population counts. Default=False.
+    workers : int, optional
+        Max. number of concurrent downloads. Default=4.
+    show_progress : bool, optional
+        Show progress bars. Default=False.
+    overwrite : bool, optional
+        Overwrite existing files. Default=False.
+
+    Returns
+    -------
+    list of str
+        Paths to output GeoTIFF files, in the same order as `jobs`.
+    """
+
+    with http_session(pool_maxsize=workers) as session:
+
+        def task(job):
+            country, year = job
+            return download(
+                country,
+                output_dir,
+                year=year,
+                un_adj=un_adj,
+                show_progress=show_progress,
+                overwrite=overwrite,
+                session=session,
+            )
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(task, jobs))
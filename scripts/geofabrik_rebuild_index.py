@@ -1,12 +1,25 @@
 #!/usr/bin/env python3
 """Re-build Geofabrik spatial index."""
 
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
 import geopandas as gpd
 import requests
 from rasterio.crs import CRS
+from shapely.geometry import Polygon
+from shapely.ops import unary_union
 
 from geohealthaccess.geofabrik import Region
 
+try:
+    import requests_cache
+
+    has_requests_cache = True
+except ImportError:
+    has_requests_cache = False
+
 BASE_URL = "http://download.geofabrik.de"
 CONTINENTS = [
     "africa",
@@ -18,36 +31,121 @@ CONTINENTS = [
     "south-america",
 ]
 
+# Max. number of concurrent requests to Geofabrik
+MAX_WORKERS = 8
 
-def main():
 
-    s = requests.Session()
-    regions = []
+def get_session():
+    """Initialize a requests session.
+
+    If requests_cache is installed, responses are cached on disk for one day
+    so that re-running the script does not hit the network again.
+    """
+    if has_requests_cache:
+        return requests_cache.CachedSession("geofabrik_cache", expire_after=86400)
+    return requests.Session()
+
 
-    # Continent level
-    for continent in CONTINENTS:
-        region = Region(s, continent)
-        regions.append(region)
-        if not region.subregions:
+@dataclass
+class RegionMeta:
+    """Attributes of a Geofabrik region required to build the index.
+
+    Geometries are not part of the crawl: they are fetched afterwards with
+    `fetch_geometry()` once all the regions are known.
+    """
+
+    id: str
+    name: str
+    subregions: list
+
+
+def _region_meta(session, region_id):
+    """Fetch a Geofabrik region and only keep the attributes of interest.
+
+    The Region object, and the parsed HTML page it holds, are released as soon
+    as the attributes have been extracted so that memory usage does not grow
+    with the number of regions crawled.
+    """
+    region = Region(session, region_id)
+    return RegionMeta(
+        id=region.id, name=region.name, subregions=region.subregions or []
+    )
+
+
+def fetch_geometry(session, meta):
+    """Fetch the geometry of a Geofabrik region from its .poly file.
+
+    Each section of the file is a ring: rings whose name starts with "!" are
+    holes that are removed from the outer rings.
+    """
+    r = session.get(f"{BASE_URL}/{meta.id}.poly", timeout=30)
+    r.raise_for_status()
+    outers, holes = [], []
+    rings, coords = None, []
+    for line in r.text.splitlines()[1:]:
+        line = line.strip()
+        if not line:
             continue
+        if rings is None and line == "END":
+            break
+        if rings is None:
+            rings = holes if line.startswith("!") else outers
+            coords = []
+        elif line == "END":
+            rings.append(Polygon(coords))
+            rings = None
+        else:
+            coords.append(tuple(float(x) for x in line.split()))
+    return unary_union(outers).difference(unary_union(holes))
 
-        # Country level
+
+def _subregions(regions, visited):
+    """List subregions of a list of regions that have not been visited yet.
+
+    Geofabrik pages may list the same subregion under different parents:
+    region ids are added to the `visited` set so that each page is only
+    fetched and parsed once.
+    """
+    subregions = []
+    for region in regions:
         for subregion in region.subregions:
-            region = Region(s, subregion)
-            regions.append(region)
-            if not region.subregions:
+            if subregion in visited:
                 continue
+            visited.add(subregion)
+            subregions.append(subregion)
+    return subregions
+
+
+def main():
+
+    s = get_session()
+    visited = set(CONTINENTS)
+
+    # Pages of a given level are fetched concurrently
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        continents = list(executor.map(partial(_region_meta, s), CONTINENTS))
+        countries = list(
+            executor.map(partial(_region_meta, s), _subregions(continents, visited))
+        )
+        subcountries = list(
+            executor.map(partial(_region_meta, s), _subregions(countries, visited))
+        )
+        regions = continents + countries + subcountries
+
+        # Geometries are only fetched once the whole tree has been crawled
+        geoms = list(executor.map(partial(fetch_geometry, s), regions))
 
-            # Sub-country level
-            for subregion in region.subregions:
-                region = Region(s, subregion)
-                regions.append(region)
+    # Collect attributes in a single pass over the regions
+    ids, names = [], []
+    for region in regions:
+        ids.append(region.id)
+        names.append(region.name)
 
     sindex = gpd.GeoDataFrame(
-        index=[region.id for region in regions],
-        data=[region.name for region in regions],
+        index=ids,
+        data=names,
         columns=["name"],
-        geometry=[region.get_geometry() for region in regions],
+        geometry=geoms,
         crs=CRS.from_epsg(4326),
     )
 
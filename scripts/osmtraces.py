@@ -1,41 +1,51 @@
 #!/usr/bin/env python3
 """Download GPS traces from OpenStreetMap for a given country."""
 
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import click
 import requests
 import gpxpy
 import geopandas as gpd
-from shapely.geometry import Point, Polygon
+from shapely.geometry import box
 import numpy as np
-from tqdm import tqdm
-from rasterio.crs import CRS
+from tqdm.contrib.concurrent import thread_map
 
-from geohealthaccess.utils import country_geometry
+from geohealthaccess.utils import country_geometry, http_session
 
+# Earth radius in meters, as used by gpxpy
+EARTH_RADIUS = 6378137.0
 
-def get_gps_traces(geom):
+
+def get_gps_traces(geom, session=None):
     """Get GPS traces from OSM intersecting a given geometry.
 
     Parameters
     ----------
     geom : shapely geometry
         Area of interest.
+    session : requests.Session, optional
+        Session used to reuse HTTP connections between requests.
 
     Returns
     -------
-    traces : str
-        GPS traces in GPX format as a raw XML string.
+    traces : GPX
+        Parsed GPS traces as a gpxpy GPX object.
     """
     ENDPOINT = "https://api.openstreetmap.org/api/0.6/"
     xmin, ymin, xmax, ymax = geom.bounds
     query = f"trackpoints?bbox={xmin},{ymin},{xmax},{ymax}&page=0"
-    with requests.get(ENDPOINT + query, stream=True) as r:
+    http = session or requests
+    with http.get(ENDPOINT + query, stream=True) as r:
         if not r.status_code == 200:
             raise requests.exceptions.HTTPError(r.text)
-        xml = r.text
-    return xml
+        # gpxpy reads and decodes the whole document anyway: handing it the
+        # raw bytes only avoids the charset detection done by r.text
+        r.raw.decode_content = True
+        return gpxpy.parse(r.raw)
 
 
 def create_grid(geom):
@@ -58,65 +68,179 @@ def create_grid(geom):
     width = int(np.ceil((xmax - xmin) / 0.25))
     height = int(np.ceil((ymax - ymin) / 0.25))
     dx, dy = 0.25, 0.25
-    cells = []
-    for i in range(width):
-        for j in range(height):
-            cells.append(
-                Polygon(
-                    [
-                        (xmin + i * dx, ymin + j * dy),
-                        (xmin + i * dx + dx, ymin + j * dy),
-                        (xmin + i * dx + dx, ymin + j * dy + dy),
-                        (xmin + i * dx, ymin + j * dy + dy),
-                    ]
-                )
+    # Lower-left corners of the cells, column by column so that cell
+    # indexes (and output filenames) are the same from one run to another
+    x0, y0 = np.meshgrid(
+        xmin + np.arange(width) * dx, ymin + np.arange(height) * dy, indexing="ij"
+    )
+    cells = gpd.GeoSeries(
+        [box(x, y, x + dx, y + dy) for x, y in zip(x0.ravel(), y0.ravel())]
+    )
+    # Query the spatial index of the cells so that the predicate is only
+    # evaluated for cells whose bounding box intersects the area of interest
+    idx = cells.sindex.query(geom, predicate="intersects")
+    return list(cells.iloc[np.sort(idx)])
+
+
+def point_speeds(lons, lats, times):
+    """Compute the speed at each point of a GPS track segment.
+
+    Vectorized equivalent of gpxpy's `GPXTrackSegment.get_speed()`: the speed
+    at a given point is the mean of the speeds from the previous point and to
+    the next one, ignoring null or undefined values. Distances are computed
+    with the haversine formula and do not take elevation into account.
+
+    Parameters
+    ----------
+    lons : 1d array
+        Decimal longitudes of the track points.
+    lats : 1d array
+        Decimal latitudes of the track points.
+    times : 1d array
+        Timestamps of the track points in seconds (NaN if unknown).
+
+    Returns
+    -------
+    speeds : 1d array
+        Speed at each point in m/s (NaN if undefined).
+    """
+    if len(lons) < 2:
+        return np.full(len(lons), np.nan)
+
+    # Haversine distances between consecutive points
+    lons, lats = np.radians(lons), np.radians(lats)
+    dlat = np.sin(np.diff(lats) / 2) ** 2
+    dlon = np.sin(np.diff(lons) / 2) ** 2
+    a = dlat + np.cos(lats[:-1]) * np.cos(lats[1:]) * dlon
+    distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = distance / np.abs(np.diff(times))
+    speed[~np.isfinite(speed) | (speed == 0)] = np.nan
+
+    # Speed from the previous point and to the next point
+    before = np.concatenate(([np.nan], speed))
+    after = np.concatenate((speed, [np.nan]))
+    count = (~np.isnan(before)).astype(int) + (~np.isnan(after)).astype(int)
+    with np.errstate(invalid="ignore"):
+        return (np.nan_to_num(before) + np.nan_to_num(after)) / count
+
+
+def _touch(fname):
+    """Create an empty file with a single open() system call."""
+    os.close(os.open(fname, os.O_CREAT | os.O_WRONLY | os.O_CLOEXEC, 0o644))
+
+
+def _write(fname, payload):
+    """Write a string to a text file."""
+    with open(fname, "w") as f:
+        f.write(payload)
+
+
+def process_cell(cell, fname, session=None, writer=None):
+    """Download GPS traces in a cell and save trackpoints with speed to disk.
+
+    Parameters
+    ----------
+    cell : shapely geometry
+        Grid cell.
+    fname : str
+        Path to output GeoJSON file. An empty file is created if no
+        trackpoint is found in the cell.
+    session : requests.Session, optional
+        Session used to reuse HTTP connections between requests.
+    writer : concurrent.futures.Executor, optional
+        Executor used to write the output file asynchronously.
+
+    Returns
+    -------
+    future : Future or None
+        Pending write operation if a writer has been provided.
+    """
+    gpx = get_gps_traces(cell, session)
+    # Accumulate point attributes in lists and build the features once
+    trackids, speeds, lons, lats = [], [], [], []
+    for trackid, track in enumerate(gpx.tracks):
+        for segment in track.segments:
+            n = len(segment.points)
+            x = np.fromiter((p.longitude for p in segment.points), float, n)
+            y = np.fromiter((p.latitude for p in segment.points), float, n)
+            t = np.fromiter(
+                (p.time.timestamp() if p.time else np.nan for p in segment.points),
+                float,
+                n,
             )
-    return [c for c in cells if c.intersects(geom)]
+            speed = point_speeds(x, y, t)
+            valid = ~np.isnan(speed)
+            trackids.extend([trackid] * np.count_nonzero(valid))
+            speeds.extend(speed[valid].tolist())
+            lons.extend(x[valid].tolist())
+            lats.extend(y[valid].tolist())
+    if not trackids:
+        # Just create an empty file to keep track of which
+        # cells have been processed
+        _touch(fname)
+        return None
+
+    # Features are serialized directly instead of going through Fiona,
+    # which writes them one by one and initializes a GDAL driver per file
+    features = [
+        {
+            "type": "Feature",
+            "properties": {"trackid": trackid, "speed": speed},
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        }
+        for trackid, speed, lon, lat in zip(trackids, speeds, lons, lats)
+    ]
+    payload = json.dumps({"type": "FeatureCollection", "features": features})
+    if writer:
+        return writer.submit(_write, fname, payload)
+    _write(fname, payload)
+    return None
 
 
 @click.command()
 @click.option("--country", "-c", type=str, help="ISO A3 country code")
 @click.option("--output-dir", "-o", type=click.Path(), help="output directory")
-def osm_traces(country, output_dir):
+@click.option(
+    "--concurrency", "-n", type=int, default=8, help="max. concurrent requests"
+)
+def osm_traces(country, output_dir, concurrency):
     """Download and parse user-uploaded OSM GPS traces for a given country."""
     output_dir = os.path.join(output_dir, country.lower())
     os.makedirs(output_dir, exist_ok=True)
     geom = country_geometry(country)
     cells = create_grid(geom)
-    pbar = tqdm(total=len(cells))
-    crs = CRS.from_epsg(4326)
+
+    # Skip cells that have already been processed in a previous run
+    done = frozenset(os.listdir(output_dir))
+    todo_cells, todo_fnames = [], []
     for cell_i, cell in enumerate(cells):
-        fname = os.path.join(output_dir, f"{str(cell_i).zfill(5)}.geojson")
-        if os.path.exists(fname):
-            pbar.update(1)
-            continue
-        trackid = 0
-        data = gpd.GeoDataFrame(columns=["trackid", "speed", "geometry"])
-        data.crs = crs
-        xml = get_gps_traces(cell)
-        gpx = gpxpy.parse(xml)
-        for track in gpx.tracks:
-            for segment in track.segments:
-                for point_i, point in enumerate(segment.points):
-                    if segment.get_speed(point_i):
-                        data = data.append(
-                            {
-                                "trackid": trackid,
-                                "speed": segment.get_speed(point_i),
-                                "geometry": Point(point.longitude, point.latitude),
-                            },
-                            ignore_index=True,
-                        )
-            trackid += 1
-        pbar.update(1)
-        if len(data):
-            data.to_file(fname, driver="GeoJSON")
-        else:
-            # Just create an empty file to keep track of which
-            # cells have been processed
-            with open(fname, "w") as f:
-                pass
-    pbar.close()
+        basename = f"{str(cell_i).zfill(5)}.geojson"
+        if basename not in done:
+            todo_cells.append(cell)
+            todo_fnames.append(os.path.join(output_dir, basename))
+
+    # Requests are I/O-bound: cells are processed concurrently in a pool of
+    # threads whose size is kept low to stay polite with the OSM API. Progress
+    # is reported by thread_map, which throttles refreshes instead of locking
+    # and writing to the terminal after each cell.
+    # All threads share the same session so that TCP and TLS connections to
+    # the API are reused from one cell to another. Output files are written
+    # in a separate pool so that download workers do not wait on disk I/O.
+    with http_session(pool_maxsize=concurrency) as session, ThreadPoolExecutor(
+        max_workers=4
+    ) as writer:
+        writes = thread_map(
+            partial(process_cell, session=session, writer=writer),
+            todo_cells,
+            todo_fnames,
+            max_workers=concurrency,
+        )
+        # Raise exceptions from write operations, if any
+        for write in writes:
+            if write:
+                write.result()
     return
 
 
@@ -0,0 +1,7 @@
+"""Tests for geohealthaccess."""
+
+from importlib.resources import files
+from pathlib import Path
+
+# Tests data directory, shared by all test modules
+DATA_DIR = Path(str(files(__package__).joinpath("data")))
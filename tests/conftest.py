@@ -3,9 +3,17 @@
 import os
 
 import pytest
-from pkg_resources import resource_filename
 from shapely import wkt
 
+from tests import DATA_DIR
+
+# Tests using one of these fixtures are run in the same pytest-xdist worker
+XDIST_GROUPS = {
+    "mock_s3fs": "minio",
+    "djibouti_extracts": "osm-extracts",
+    "djibouti": "djibouti",
+}
+
 
 def pytest_addoption(parser):
     """Add --remote pytest option."""
@@ -17,13 +25,44 @@ def pytest_addoption(parser):
     )
 
 
+def _earthdata_credentials_set():
+    """Check that EarthData credentials are set."""
+    user = bool(os.environ.get("EARTHDATA_USERNAME"))
+    pswd = bool(os.environ.get("EARTHDATA_PASSWORD"))
+    return user and pswd
+
+
 def pytest_configure(config):
-    """Add `remote` pytest marker."""
+    """Add `remote`, `earthdata` and `xdist_group` pytest markers."""
     config.addinivalue_line("markers", "remote: mark test as requesting remote data")
+    config.addinivalue_line(
+        "markers", "earthdata: mark test as requiring earthdata credentials"
+    )
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run tests of a group in the same xdist worker"
+    )
 
 
 def pytest_collection_modifyitems(config, items):
-    """Configure `remote` pytest marker."""
+    """Configure `remote` and `earthdata` pytest markers and xdist groups.
+
+    Tests relying on the local Minio server all bind the same port: they are
+    grouped so that pytest-xdist (`-n auto --dist loadgroup`) runs them
+    sequentially in a single worker while other tests are distributed freely.
+    Tests sharing an expensive module-scoped fixture are grouped as well, so
+    that the fixture is only computed by one worker.
+    """
+    skip_earthdata = pytest.mark.skip(reason="requires earthdata credentials")
+    has_earthdata = _earthdata_credentials_set()
+    for item in items:
+        fixturenames = getattr(item, "fixturenames", ())
+        for fixture, group in XDIST_GROUPS.items():
+            if fixture in fixturenames:
+                item.add_marker(pytest.mark.xdist_group(name=group))
+                break
+        if "earthdata" in item.keywords and not has_earthdata:
+            item.add_marker(skip_earthdata)
+
     if config.getoption("--remote"):
         return
     skip_remote = pytest.mark.skip(reason="need --remote option to run")
@@ -32,14 +71,12 @@ def pytest_collection_modifyitems(config, items):
             item.add_marker(skip_remote)
 
 
-@pytest.fixture
-def tests_data(scope="session"):
+@pytest.fixture(scope="session")
+def tests_data():
     """A dict with paths and URLs to tests data files."""
     datafiles = {}
     tests_dataurl = "https://github.com/BLSQ/geohealthaccess/raw/master/tests/data/"
-    tests_datadir = os.path.dirname(
-        resource_filename(__name__, "data/madagascar.geojson")
-    )
+    tests_datadir = str(DATA_DIR)
     for f in os.listdir(tests_datadir):
         datafiles[f] = {}
         datafiles[f]["github_url"] = tests_dataurl + f
@@ -48,17 +85,30 @@ def tests_data(scope="session"):
     return datafiles
 
 
-@pytest.fixture
-def senegal(scope="module"):
+def _load_wkt(path):
+    """Load a single geometry from a WKT file in the tests package.
+
+    The file is read at once and parsed with `wkt.loads`. Each file only
+    contains a single geometry, so there is nothing to vectorize with the
+    array-based parsers of Shapely 2.
+    """
+    with open(str(DATA_DIR / path)) as f:
+        return wkt.loads(f.read())
+
+
+@pytest.fixture(scope="session")
+def senegal():
     """Load a simplified geometry of Senegal."""
-    fname = resource_filename(__name__, "data/senegal.wkt")
-    with open(fname) as f:
-        return wkt.load(f)
+    return _load_wkt("senegal.wkt")
 
 
-@pytest.fixture
-def madagascar(scope="module"):
+@pytest.fixture(scope="session")
+def madagascar():
     """Load a simplified geometry of Madagascar."""
-    fname = resource_filename(__name__, "data/madagascar.wkt")
-    with open(fname) as f:
-        return wkt.load(f)
+    return _load_wkt("madagascar.wkt")
+
+
+@pytest.fixture(scope="session")
+def djibouti_geom():
+    """Load a simplified geometry of Djibouti."""
+    return _load_wkt("djibouti.wkt")
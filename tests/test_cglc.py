@@ -5,15 +5,14 @@ from tempfile import TemporaryDirectory
 
 import pytest
 import rasterio
-from pkg_resources import resource_filename
 from rasterio.crs import CRS
-from shapely import wkt
 from shapely.geometry import Point
 
 from geohealthaccess import cglc
+from tests import DATA_DIR
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def catalog():
     return cglc.CGLC()
 
@@ -38,17 +37,9 @@ def test_format_latlon(catalog):
     assert catalog.format_latlon(-40, -120) == "W120S40"
 
 
-def test_search(catalog):
-    with open(resource_filename(__name__, "data/madagascar.wkt")) as f:
-        geom = wkt.load(f)
-        tiles = sorted(catalog.search(geom))
-        expected = sorted(["E040N00", "E040S20"])
-        assert tiles == expected
-    with open(resource_filename(__name__, "data/senegal.wkt")) as f:
-        geom = wkt.load(f)
-        tiles = sorted(catalog.search(geom))
-        expected = sorted(["W020N20"])
-        assert tiles == expected
+def test_search(catalog, madagascar, senegal):
+    assert sorted(catalog.search(madagascar)) == ["E040N00", "E040S20"]
+    assert sorted(catalog.search(senegal)) == ["W020N20"]
 
 
 @pytest.mark.web
@@ -67,7 +58,7 @@ def test_download(catalog):
 
 
 def test_preprocess(catalog):
-    src_dir = resource_filename(__name__, "data/cglc-raw-data")
+    src_dir = str(DATA_DIR / "cglc-raw-data")
     geom = Point(20, 0).buffer(0.1)
     crs = CRS.from_epsg(3857)
     res = 500
@@ -6,30 +6,21 @@ from tempfile import TemporaryDirectory
 
 import pytest
 from click.testing import CliRunner
-from pkg_resources import resource_filename
 
 from geohealthaccess.cli import cli
+from tests import DATA_DIR
 
 
-def _credentials_set():
-    """Check that EarthData credentials are set."""
-    user = bool(os.environ.get("EARTHDATA_USERNAME"))
-    pswd = bool(os.environ.get("EARTHDATA_PASSWORD"))
-    return user and pswd
-
-
-# marker to skip tests if earthdata credentials are not set
-earthdata = pytest.mark.skipif(
-    not _credentials_set(), reason="requires earthdata credentials"
-)
+@pytest.fixture(scope="module")
+def runner():
+    return CliRunner()
 
 
 @pytest.mark.web
 @pytest.mark.slow
-@earthdata
-def test_download():
+@pytest.mark.earthdata
+def test_download(runner):
     with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-        runner = CliRunner()
         result = runner.invoke(
             cli, ["download", "--country", "com", "--output-dir", tmp_dir]
         )
@@ -42,10 +33,9 @@ def test_download():
 
 
 @pytest.mark.slow
-def test_preprocess():
+def test_preprocess(runner):
     with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-        runner = CliRunner()
-        input_dir = resource_filename(__name__, "data/com-test-data/raw")
+        input_dir = str(DATA_DIR / "com-test-data/raw")
         result = runner.invoke(
             cli, ["preprocess", "-c", "com", "-i", input_dir, "-o", tmp_dir, "-r", 1000]
         )
@@ -62,10 +52,9 @@ def test_preprocess():
 
 
 @pytest.mark.slow
-def test_access():
+def test_access(runner):
     with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-        runner = CliRunner()
-        input_dir = resource_filename(__name__, "data/com-test-data/input")
+        input_dir = str(DATA_DIR / "com-test-data/input")
         result = runner.invoke(
             cli,
             [
@@ -77,7 +66,7 @@ def test_access():
                 "-o",
                 tmp_dir,
                 "--areas",
-                resource_filename(__name__, "data/com-test-data/gadm.gpkg"),
+                str(DATA_DIR / "com-test-data/gadm.gpkg"),
                 "--car",
                 "--walk",
                 "--no-bike",
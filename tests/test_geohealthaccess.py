@@ -2,16 +2,17 @@
 
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from tempfile import TemporaryDirectory
 
 import geopandas as gpd
 import numpy as np
 import pytest
 import rasterio
-from pkg_resources import resource_filename
 from shapely import wkt
 
 from geohealthaccess.geohealthaccess import GeoHealthAccess
+from tests import DATA_DIR
 
 
 def test_gha_init():
@@ -32,7 +33,7 @@ def test_gha_init():
 def djibouti(tmp_path_factory):
     """A GeoHealthAccess instance."""
     tmp_dir = tmp_path_factory.mktemp("data")
-    with open(resource_filename(__name__, "data/dji-test-data/aoi.wkt")) as f:
+    with open(str(DATA_DIR / "dji-test-data/aoi.wkt")) as f:
         aoi = wkt.load(f)
     gha = GeoHealthAccess(
         raw_dir=tmp_dir.joinpath("raw").as_posix(),
@@ -46,6 +47,31 @@ def djibouti(tmp_path_factory):
     shutil.rmtree(str(tmp_dir))
 
 
+@pytest.fixture(scope="module")
+def djibouti_input(djibouti):
+    """The GeoHealthAccess instance with preprocessed input data."""
+    djibouti.input_dir = str(DATA_DIR / "dji-test-data" / "input")
+    return djibouti
+
+
+@pytest.fixture(scope="module")
+def friction_car(djibouti_input):
+    """Car friction surface, computed once per module."""
+    return djibouti_input.friction_surface(mode="car", max_slope=35)
+
+
+@pytest.fixture(scope="module")
+def friction_walk(djibouti_input):
+    """Walking friction surface, computed once per module."""
+    return djibouti_input.friction_surface(mode="walk", max_slope=35, walk_speed=5)
+
+
+@pytest.fixture(scope="module")
+def health(djibouti_input):
+    """Health facilities, loaded once per module."""
+    return djibouti_input.health_facilities()
+
+
 def test_gha_dump_update_spatial_info(djibouti):
 
     djibouti.dump_spatial_info()
@@ -76,9 +102,7 @@ def test_compute_mask(djibouti):
 @pytest.mark.slow
 def test_preprocessing(djibouti):
 
-    djibouti.raw_dir = os.path.join(
-        resource_filename(__name__, "data/dji-test-data"), "raw"
-    )
+    djibouti.raw_dir = str(DATA_DIR / "dji-test-data" / "raw")
 
     djibouti.preprocessing(show_progress=None)
 
@@ -93,8 +117,13 @@ def test_preprocessing(djibouti):
     assert "water_osm.tif" in os.listdir(djibouti.input_dir)
 
     # all rasters should be aligned, except population
-    for f in os.listdir(djibouti.input_dir):
-        if f.endswith(".tif") and "population" not in f:
+    rasters = sorted(
+        f
+        for f in os.listdir(djibouti.input_dir)
+        if f.endswith(".tif") and "population" not in f
+    )
+    with rasterio.Env():
+        for f in rasters:
             with rasterio.open(os.path.join(djibouti.input_dir, f)) as src:
                 assert src.height == djibouti.shape[0]
                 assert src.width == djibouti.shape[1]
@@ -102,24 +131,18 @@ def test_preprocessing(djibouti):
                 assert src.transform == djibouti.transform
 
 
-def test_moving_obstacle(djibouti):
-
-    djibouti.input_dir = os.path.join(
-        resource_filename(__name__, "data/dji-test-data"), "input"
-    )
+def test_moving_obstacle(djibouti_input):
 
+    djibouti = djibouti_input
     obstacle = djibouti.moving_obstacle(max_slope=10)
     assert obstacle.shape == djibouti.shape
     assert np.count_nonzero(obstacle)
     assert np.count_nonzero(~obstacle)
 
 
-def test_off_road_speed(djibouti):
-
-    djibouti.input_dir = os.path.join(
-        resource_filename(__name__, "data/dji-test-data"), "input"
-    )
+def test_off_road_speed(djibouti_input):
 
+    djibouti = djibouti_input
     off_road = djibouti.off_road_speed()
     assert off_road.shape == djibouti.shape
     # mean off road speed should be between 2 and 5 km/h
@@ -128,12 +151,9 @@ def test_off_road_speed(djibouti):
     assert mean_speed <= 5
 
 
-def test_on_road_speed(djibouti):
-
-    djibouti.input_dir = os.path.join(
-        resource_filename(__name__, "data/dji-test-data"), "input"
-    )
+def test_on_road_speed(djibouti_input):
 
+    djibouti = djibouti_input
     on_road = djibouti.on_road_speed()
     assert on_road.shape == djibouti.shape
     # mean off road speed should be between 10 and 70 km/h
@@ -152,101 +172,88 @@ def test_segment_speed(djibouti):
     )
 
 
-def test_friction_surface(djibouti):
-
-    djibouti.input_dir = os.path.join(
-        resource_filename(__name__, "data/dji-test-data"), "input"
-    )
-
-    f_car = djibouti.friction_surface(mode="car", max_slope=35)
-    f_walk = djibouti.friction_surface(mode="walk", max_slope=35, walk_speed=5)
-
-    assert f_car.shape == djibouti.shape
-    assert f_walk.shape == djibouti.shape
-    assert not (f_car == f_walk).all()
+def test_friction_surface(djibouti, friction_car, friction_walk):
 
+    assert friction_car.shape == djibouti.shape
+    assert friction_walk.shape == djibouti.shape
+    assert not (friction_car == friction_walk).all()
 
-def test_health_facilities(djibouti):
 
-    djibouti.input_dir = os.path.join(
-        resource_filename(__name__, "data/dji-test-data"), "input"
-    )
+def test_health_facilities(djibouti, health):
 
-    health = djibouti.health_facilities()
     assert len(health) >= 25
     assert health.crs == djibouti.crs
     assert health.is_valid.all()
 
 
-def test_isotropic_costdistance(djibouti):
-
-    djibouti.input_dir = os.path.join(
-        resource_filename(__name__, "data/dji-test-data"), "input"
-    )
-
-    djibouti.isotropic_costdistance(
-        src_friction=djibouti.friction_surface(mode="car", max_slope=35),
-        src_target=djibouti.health_facilities(),
-        dst_dir=os.path.join(djibouti.output_dir, "test-car"),
-    )
-
-    with rasterio.open(
-        os.path.join(djibouti.output_dir, "test-car", "cost.tif")
-    ) as src:
-        assert src.transform == djibouti.transform
-        data = src.read(1, masked=True)
-        # mean travel time should be between 30mn and 3h
-        assert data.mean() >= 1800
-        assert data.mean() <= 10800
-
-    with rasterio.open(
-        os.path.join(djibouti.output_dir, "test-car", "nearest.tif")
-    ) as src:
-        assert src.transform == djibouti.transform
-
-    with rasterio.open(
-        os.path.join(djibouti.output_dir, "test-car", "backlink.tif")
-    ) as src:
-        assert src.transform == djibouti.transform
-
-
-def test_anisotropic_costdistance(djibouti):
-
-    djibouti.input_dir = os.path.join(
-        resource_filename(__name__, "data/dji-test-data"), "input"
-    )
-
-    djibouti.anisotropic_costdistance(
-        src_friction=djibouti.friction_surface(mode="walk", max_slope=35),
-        src_target=djibouti.health_facilities(),
-        dst_dir=os.path.join(djibouti.output_dir, "test-walk"),
-    )
-
-    with rasterio.open(
-        os.path.join(djibouti.output_dir, "test-walk", "cost.tif")
-    ) as src:
-        assert src.transform == djibouti.transform
-        data = src.read(1, masked=True)
-        # mean travel time should be between 30mn and 10h
-        assert data.mean() >= 1800
-        assert data.mean() <= 36000
+@pytest.fixture(scope="module")
+def costdistances(djibouti, friction_car, friction_walk, health):
+    """Run isotropic and anisotropic cost distance analyses concurrently.
+
+    GRASS GIS is configured through environment variables, so each analysis
+    runs in its own process rather than in a thread.
+    """
+    dst_dirs = {
+        "car": os.path.join(djibouti.output_dir, "test-car"),
+        "walk": os.path.join(djibouti.output_dir, "test-walk"),
+    }
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(
+                djibouti.isotropic_costdistance,
+                src_friction=friction_car,
+                src_target=health,
+                dst_dir=dst_dirs["car"],
+            ),
+            executor.submit(
+                djibouti.anisotropic_costdistance,
+                src_friction=friction_walk,
+                src_target=health,
+                dst_dir=dst_dirs["walk"],
+            ),
+        ]
+        for future in futures:
+            future.result()
+    return dst_dirs
+
+
+def test_isotropic_costdistance(djibouti, costdistances):
+
+    # outputs are opened in a single GDAL environment and only the
+    # travel times are read from disk
+    dst_dir = costdistances["car"]
+    with rasterio.Env():
+        with rasterio.open(os.path.join(dst_dir, "cost.tif")) as src:
+            assert src.transform == djibouti.transform
+            data = src.read(1, masked=True)
+            # mean travel time should be between 30mn and 3h
+            assert data.mean() >= 1800
+            assert data.mean() <= 10800
+        for fname in ("nearest.tif", "backlink.tif"):
+            with rasterio.open(os.path.join(dst_dir, fname)) as src:
+                assert src.transform == djibouti.transform
 
-    with rasterio.open(
-        os.path.join(djibouti.output_dir, "test-walk", "nearest.tif")
-    ) as src:
-        assert src.transform == djibouti.transform
 
-    with rasterio.open(
-        os.path.join(djibouti.output_dir, "test-walk", "backlink.tif")
-    ) as src:
-        assert src.transform == djibouti.transform
+def test_anisotropic_costdistance(djibouti, costdistances):
+
+    # outputs are opened in a single GDAL environment and only the
+    # travel times are read from disk
+    dst_dir = costdistances["walk"]
+    with rasterio.Env():
+        with rasterio.open(os.path.join(dst_dir, "cost.tif")) as src:
+            assert src.transform == djibouti.transform
+            data = src.read(1, masked=True)
+            # mean travel time should be between 30mn and 10h
+            assert data.mean() >= 1800
+            assert data.mean() <= 36000
+        for fname in ("nearest.tif", "backlink.tif"):
+            with rasterio.open(os.path.join(dst_dir, fname)) as src:
+                assert src.transform == djibouti.transform
 
 
 def test_fill(djibouti):
 
-    with rasterio.open(
-        resource_filename(__name__, "data/dji-test-data/output/car/cost.tif")
-    ) as src:
+    with rasterio.open(str(DATA_DIR / "dji-test-data/output/car/cost.tif")) as src:
         nodata = src.nodata
         cost = src.read(1)
 
@@ -256,9 +263,7 @@ def test_fill(djibouti):
 
 def test_population_counts(djibouti):
 
-    areas = gpd.read_file(
-        resource_filename(__name__, "data/dji-test-data/gadm.gpkg"), driver="GPKG"
-    )
+    areas = gpd.read_file(str(DATA_DIR / "dji-test-data/gadm.gpkg"), driver="GPKG")
     counts = djibouti.population_counts(areas)
     assert counts.iloc[0] == pytest.approx(115000, rel=0.1)
     assert counts.iloc[1] == pytest.approx(41000, rel=0.1)
@@ -267,13 +272,9 @@ def test_population_counts(djibouti):
 
 def test_accessibility_stats(djibouti):
 
-    areas = gpd.read_file(
-        resource_filename(__name__, "data/dji-test-data/gadm.gpkg"), driver="GPKG"
-    )
+    areas = gpd.read_file(str(DATA_DIR / "dji-test-data/gadm.gpkg"), driver="GPKG")
 
-    with rasterio.open(
-        resource_filename(__name__, "data/dji-test-data/output/car/cost.tif")
-    ) as src:
+    with rasterio.open(str(DATA_DIR / "dji-test-data/output/car/cost.tif")) as src:
         stats = djibouti.accessibility_stats(
             cost=src.read(1, masked=True), areas=areas, levels=[30, 90]
         )
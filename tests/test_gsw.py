@@ -1,18 +1,17 @@
 """Tests for GSW module."""
 
 import os
-import tempfile
 
+import numpy as np
 import pytest
 import rasterio
 import requests
-from geohealthaccess.gsw import GSW, preprocess
-from pkg_resources import resource_filename
+from geohealthaccess.gsw import GSW, _grid_location_ids, preprocess
 from rasterio.crs import CRS
-from shapely import wkt
+from tests import DATA_DIR
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def gsw():
     return GSW()
 
@@ -35,11 +34,18 @@ def test_gsw_location_id(gsw, lat, lon, locid):
     assert gsw.location_id(lat, lon) == locid
 
 
+def test_grid_location_ids(gsw):
+    lats = np.array([40, -40, 0, 80])
+    lons = np.array([30, 30, -10, -180])
+    expected = [gsw.location_id(lat, lon) for lat, lon in zip(lats, lons)]
+    assert _grid_location_ids(lats, lons).tolist() == expected
+
+
 def test_gsw_spatial_index(gsw):
     assert len(gsw.sindex) == 504
     assert "50E_50N" in gsw.sindex.index
     assert gsw.sindex.is_valid.all()
-    assert gsw.sindex.unary_union.bounds == (-180, -60, 180, 80)
+    assert np.allclose(gsw.sindex.total_bounds, (-180, -60, 180, 80))
 
 
 def test_gsw_search(gsw, madagascar, senegal):
@@ -60,30 +66,41 @@ def test_gsw_url(gsw, tile, product, url):
     assert gsw.url(tile, product) == BASE_URL + url
 
 
-def test_gsw_download(gsw, monkeypatch):
+def test_gsw_download(gsw, monkeypatch, tmp_path):
+    def mockreturn(self, chunk_size):
+        return [b"", b"", b""]
+
+    monkeypatch.setattr(requests.Response, "iter_content", mockreturn)
+
+    tile = "40E_20N"
+    gsw.download(tile, "seasonality", str(tmp_path))
+    assert (tmp_path / "seasonality_40E_20N_v1_1.tif").is_file()
+
+
+def test_gsw_download_many(gsw, monkeypatch, tmp_path):
     def mockreturn(self, chunk_size):
         return [b"", b"", b""]
 
     monkeypatch.setattr(requests.Response, "iter_content", mockreturn)
 
-    with tempfile.TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-        tile = "40E_20N"
-        gsw.download(tile, "seasonality", tmp_dir)
-        assert os.path.isfile(os.path.join(tmp_dir, "seasonality_40E_20N_v1_1.tif"))
+    tiles = ["40E_20N", "50E_20N"]
+    paths = gsw.download_many(tiles, "seasonality", str(tmp_path), workers=2)
+    assert [os.path.basename(f) for f in paths] == [
+        "seasonality_40E_20N_v1_1.tif",
+        "seasonality_50E_20N_v1_1.tif",
+    ]
 
 
-def test_gsw_preprocess():
-    src_dir = resource_filename(__name__, "data/gsw-raw-data")
-    with open(resource_filename(__name__, "data/djibouti.wkt")) as f:
-        geom = wkt.load(f)
+def test_gsw_preprocess(djibouti_geom, tmp_path):
+    src_dir = str(DATA_DIR / "gsw-raw-data")
+    geom = djibouti_geom
     crs = CRS.from_epsg(3857)
     res = 100
-    with tempfile.TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-        dst_file = os.path.join(tmp_dir, "water.tif")
-        preprocess(src_dir, dst_file, crs, res, geom)
-        with rasterio.open(dst_file) as src:
-            assert src.transform.a == res
-            assert src.crs == crs
-            data = src.read(1, masked=True)
-            assert data.min() >= 0
-            assert data.max() <= 12
+    dst_file = str(tmp_path / "water.tif")
+    preprocess(src_dir, dst_file, crs, res, geom)
+    with rasterio.open(dst_file) as src:
+        assert src.transform.a == res
+        assert src.crs == crs
+        data = src.read(1, masked=True)
+        assert data.min() >= 0
+        assert data.max() <= 12
@@ -1,13 +1,13 @@
 """Tests for preprocessing module."""
 
 import os
-from pkg_resources import resource_filename
 import pytest
 import rasterio
 from rasterio.crs import CRS
 from tempfile import TemporaryDirectory
 
 from geohealthaccess import preprocessing
+from tests import DATA_DIR
 
 
 def test_default_compression_int():
@@ -43,7 +43,7 @@ def test_create_grid(senegal):
 
 def test_merge_tiles():
     tiles = [
-        resource_filename(__name__, f"data/{tile_id}.tif")
+        str(DATA_DIR / f"{tile_id}.tif")
         for tile_id in ("S03E030", "S04E029", "S04E030")
     ]
     with TemporaryDirectory(prefix="geohealthaccess_") as tmpdir:
@@ -66,7 +66,7 @@ def test_reproject():
         3432420.99829369,
         -256444.80445172396,
     )
-    src_file = resource_filename(__name__, "data/S03E030.tif")
+    src_file = str(DATA_DIR / "S03E030.tif")
     with TemporaryDirectory(prefix="geohealthaccess_") as tmpdir:
         dst_file = preprocessing.reproject(
             src_file,
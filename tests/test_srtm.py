@@ -1,27 +1,23 @@
 """Tests for SRTM module."""
 
+import json
 import os
 import tempfile
+import time
 
 import pytest
 import rasterio
-from geohealthaccess.srtm import SRTM, preprocess
-from pkg_resources import resource_filename
+import requests
+from geohealthaccess import srtm as srtm_module
+from geohealthaccess.srtm import SRTM, _find_authenticity_token, preprocess
 from rasterio.crs import CRS
 from shapely.geometry import Point
+from tests import DATA_DIR
 
 
-def _credentials_set():
-    """Check that EarthData credentials are set."""
-    user = bool(os.environ.get("EARTHDATA_USERNAME"))
-    pswd = bool(os.environ.get("EARTHDATA_PASSWORD"))
-    return user and pswd
-
-
-# marker to skip tests if earthdata credentials are not set
-earthdata = pytest.mark.skipif(
-    not _credentials_set(), reason="requires earthdata credentials"
-)
+@pytest.fixture(scope="session")
+def srtm():
+    return SRTM()
 
 
 @pytest.fixture(scope="module")
@@ -31,8 +27,85 @@ def geom():
     return p.buffer(0.1, resolution=2)
 
 
-def test_srtm_search(geom):
+def test_sizes_cache(monkeypatch, tmp_path):
+    cache_file = tmp_path / "srtm_sizes.json"
+    now = time.time()
+    entries = {
+        "recent.zip": {"size": 1024, "time": now},
+        "expired.zip": {"size": 2048, "time": now - srtm_module.SIZES_CACHE_MAX_AGE},
+        "legacy.zip": 4096,
+    }
+    cache_file.write_text(json.dumps(entries))
+    monkeypatch.setattr(srtm_module, "SIZES_CACHE", str(cache_file))
+    srtm_module._sizes_cache.cache_clear()
+    try:
+        sizes = srtm_module._sizes_cache()
+        assert list(sizes) == ["recent.zip"]
+
+        # nothing is written back if no tile has been added
+        srtm_module._save_sizes_cache(sizes, frozenset(sizes))
+        assert json.loads(cache_file.read_text()) == entries
+
+        sizes["new.zip"] = {"size": 512, "time": now}
+        srtm_module._save_sizes_cache(sizes, frozenset(["recent.zip"]))
+        assert set(json.loads(cache_file.read_text())) == {"recent.zip", "new.zip"}
+    finally:
+        srtm_module._sizes_cache.cache_clear()
+
+
+class _HeadSession:
+    """Fake requests session answering HEAD requests."""
+
+    def __init__(self, url, headers):
+        self.url = url
+        self.headers = headers
+
+    def head(self, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = self.url or url
+        response.headers.update(self.headers)
+        return response
+
+
+def test_download_size(monkeypatch):
+    sizes = {}
+    monkeypatch.setattr(srtm_module, "_sizes_cache", lambda: sizes)
     catalog = SRTM()
+    tile = "N00E020.SRTMGL1.hgt.zip"
+
+    # login page is not cached
+    catalog.session = _HeadSession(catalog.LOGIN_URL, {"Content-Length": "512"})
+    assert catalog.download_size(tile) == 512
+    assert tile not in sizes
+
+    # missing size
+    catalog.session = _HeadSession(None, {"Transfer-Encoding": "chunked"})
+    assert catalog.download_size(tile) is None
+    assert tile not in sizes
+
+    catalog.session = _HeadSession(None, {"Content-Length": "1024"})
+    assert catalog.download_size(tile) == 1024
+    assert sizes[tile]["size"] == 1024
+
+
+def test_find_authenticity_token():
+    page = (
+        '<form><input type="hidden" name="utf8" value="&#x2713;" />'
+        '<input type="hidden" name="authenticity_token" value="a+b/c==" />'
+        "</form>"
+    )
+    assert _find_authenticity_token(page) == "a+b/c=="
+    with pytest.raises(ValueError):
+        _find_authenticity_token("<form></form>")
+
+
+def test_srtm_spatial_index(srtm):
+    assert len(srtm.sindex) == 14295
+    assert srtm.sindex.is_valid.all()
+
+
+def test_srtm_search(srtm, geom):
 
     expected_tiles = [
         "N00E019.SRTMGL1.hgt.zip",
@@ -41,12 +114,12 @@ def test_srtm_search(geom):
         "S01E020.SRTMGL1.hgt.zip",
     ]
 
-    tiles = catalog.search(geom)
+    tiles = srtm.search(geom)
     assert sorted(expected_tiles) == sorted(tiles)
 
 
 @pytest.mark.web
-@earthdata
+@pytest.mark.earthdata
 def test_srtm_download():
     catalog = SRTM()
     catalog.authentify(os.getenv("EARTHDATA_USERNAME"), os.getenv("EARTHDATA_PASSWORD"))
@@ -56,8 +129,20 @@ def test_srtm_download():
         assert os.path.isfile(os.path.join(tmp_dir, "N37E011.SRTMGL1.hgt.zip"))
 
 
+def test_srtm_download_many(srtm, monkeypatch):
+    def mockreturn(self, tile, output_dir, **kwargs):
+        return os.path.join(output_dir, tile)
+
+    monkeypatch.setattr(SRTM, "download", mockreturn)
+
+    tiles = ["N00E019.SRTMGL1.hgt.zip", "N00E020.SRTMGL1.hgt.zip"]
+    with tempfile.TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
+        paths = srtm.download_many(tiles, tmp_dir, workers=2)
+        assert paths == [os.path.join(tmp_dir, tile) for tile in tiles]
+
+
 def test_preprocess(geom):
-    src_dir = resource_filename(__name__, "data/srtm-raw-data")
+    src_dir = str(DATA_DIR / "srtm-raw-data")
     crs = CRS.from_epsg(3857)
     res = 500
     with tempfile.TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
@@ -15,16 +15,26 @@ Installation::
 
 import os
 import shutil
+import socket
 import subprocess
+import time
+import uuid
 from contextlib import contextmanager
-from tempfile import TemporaryDirectory
 
-import psutil
 import pytest
 import s3fs
-from pkg_resources import resource_filename
 
 from geohealthaccess import storage
+from tests import DATA_DIR
+
+
+def _minio_is_running(port=9001):
+    """Check if a server accepts TCP connections on a local port."""
+    try:
+        with socket.create_connection(("localhost", port), timeout=0.1):
+            return True
+    except OSError:
+        return False
 
 
 @contextmanager
@@ -32,9 +42,16 @@ def minio_serve(data_dir):
     """A Context Manager to launch and close a Minio server."""
     p = subprocess.Popen(["minio", "server", "--address", ":9001", data_dir])
     try:
+        # Wait for the server to listen instead of sending HTTP requests
+        # before it is ready
+        for _ in range(100):
+            if _minio_is_running():
+                break
+            time.sleep(0.1)
         yield p
     finally:
-        psutil.Process(p.pid).kill()
+        p.kill()
+        p.wait(timeout=5)
 
 
 def _minio_available():
@@ -50,16 +67,53 @@ minio = pytest.mark.skipif(not _minio_available(), reason="requires minio")
 def mock_s3fs(monkeypatch):
     """Mock storage.get_s3fs() to use local Minio server."""
 
+    fs = None
+
     def mockreturn():
-        return s3fs.S3FileSystem(
-            key="minioadmin",
-            secret="minioadmin",
-            client_kwargs={"endpoint_url": "http://localhost:9001", "region_name": ""},
-        )
+        # The filesystem is shared by all storage calls of a test
+        nonlocal fs
+        if fs is None:
+            fs = s3fs.S3FileSystem(
+                key="minioadmin",
+                secret="minioadmin",
+                client_kwargs={
+                    "endpoint_url": "http://localhost:9001",
+                    "region_name": "",
+                },
+                config_kwargs={"max_pool_connections": 50},
+            )
+        return fs
 
     monkeypatch.setattr(storage, "get_s3fs", mockreturn)
 
 
+@pytest.fixture(scope="session")
+def minio_data_dir(tmp_path_factory):
+    """Data directory of a Minio server running during the whole session.
+
+    The server is only launched once, with a bucket populated with input
+    test data that is shared by the tests that do not modify it.
+    """
+    data_dir = str(tmp_path_factory.mktemp("minio"))
+    test_data_dir = str(DATA_DIR / "com-test-data/input")
+    shutil.copytree(test_data_dir, os.path.join(data_dir, "bucket", "input"))
+    with minio_serve(data_dir):
+        yield data_dir
+
+
+@pytest.fixture
+def bucket(minio_data_dir):
+    """Name of a new bucket populated with input test data.
+
+    Tests modifying the contents of a bucket use their own so that they do
+    not interfere with each other.
+    """
+    name = f"bucket-{uuid.uuid4().hex[:8]}"
+    test_data_dir = str(DATA_DIR / "com-test-data/input")
+    shutil.copytree(test_data_dir, os.path.join(minio_data_dir, name, "input"))
+    return name
+
+
 def test_storage_location():
 
     loc = storage.Location("/data/output/cost.tif")
@@ -80,172 +134,136 @@ def test_storage_location():
 
 
 @minio
-def test_ls(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
-
-        with minio_serve(tmp_dir):
-            ls_local = storage.ls(test_data_dir)
-            ls_remote = storage.ls("s3://bucket/input")
+def test_ls(mock_s3fs, minio_data_dir):
+    test_data_dir = str(DATA_DIR / "com-test-data/input")
+    ls_local = storage.ls(test_data_dir)
+    ls_remote = storage.ls("s3://bucket/input")
 
     assert sorted(ls_local) == sorted(ls_remote)
 
 
 @minio
-def test_cp(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        os.makedirs(os.path.join(tmp_dir, "bucket2"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
+def test_cp(mock_s3fs, minio_data_dir, bucket, tmp_path):
+    test_data_dir = str(DATA_DIR / "com-test-data/input")
 
-        with minio_serve(tmp_dir):
+    # from local to s3
+    src = os.path.join(test_data_dir, "elevation.tif")
+    dst = f"s3://{bucket}/input/elevation.tif"
+    storage.cp(src, dst)
+    assert os.path.isfile(os.path.join(minio_data_dir, bucket, "input/elevation.tif"))
 
-            # from local to s3
-            src = os.path.join(test_data_dir, "elevation.tif")
-            dst = "s3://bucket/input/elevation.tif"
-            storage.cp(src, dst)
-            assert os.path.isfile(os.path.join(tmp_dir, "bucket/input/elevation.tif"))
+    # from s3 to local
+    dst2 = str(tmp_path / "elevation.tif")
+    storage.cp(dst, dst2)
+    assert os.path.isfile(dst2)
+    assert os.path.getsize(src) == os.path.getsize(dst2)
 
-            # from s3 to local
-            dst2 = os.path.join(tmp_dir, "elevation.tif")
-            storage.cp(dst, dst2)
-            assert os.path.isfile(dst2)
-            assert os.path.getsize(src) == os.path.getsize(dst2)
-
-            # from s3 to s3
-            dst3 = "s3://bucket2/elevation.tif"
-            storage.cp(dst, dst3)
-            assert os.path.isfile(os.path.join(tmp_dir, "bucket2/elevation.tif"))
+    # from s3 to s3
+    dst3 = f"s3://{bucket}/copy/elevation.tif"
+    storage.cp(dst, dst3)
+    assert os.path.isfile(os.path.join(minio_data_dir, bucket, "copy/elevation.tif"))
 
 
 @minio
-def test_rm(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
-
-        with minio_serve(tmp_dir):
-
-            # local
-            src1 = os.path.join(tmp_dir, "bucket/input/elevation.tif")
-            storage.rm(src1)
-            assert not os.path.isfile(src1)
+def test_rm(mock_s3fs, minio_data_dir, bucket):
+    # local
+    src1 = os.path.join(minio_data_dir, bucket, "input/elevation.tif")
+    storage.rm(src1)
+    assert not os.path.isfile(src1)
 
-            # s3
-            src2 = "s3://bucket/input/health.gpkg"
-            storage.rm(src2)
-            assert not os.path.isfile(os.path.join(tmp_dir, "bucket/input/health.gpkg"))
+    # s3
+    src2 = f"s3://{bucket}/input/health.gpkg"
+    storage.rm(src2)
+    assert not os.path.isfile(os.path.join(minio_data_dir, bucket, "input/health.gpkg"))
 
 
 @minio
-def test_exists(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
+def test_exists(mock_s3fs, minio_data_dir):
+    test_data_dir = str(DATA_DIR / "com-test-data/input")
 
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
+    # local
+    src1 = os.path.join(test_data_dir, "elevation.tif")
+    assert storage.exists(src1)
+    assert not storage.exists(src1 + "xxx")
 
-        with minio_serve(tmp_dir):
-
-            # local
-            src1 = os.path.join(test_data_dir, "elevation.tif")
-            assert storage.exists(src1)
-            assert not storage.exists(src1 + "xxx")
-
-            # s3
-            src2 = "s3://bucket/input/elevation.tif"
-            assert storage.exists(src2)
-            assert not storage.exists(src2 + "xxx")
+    # s3
+    src2 = "s3://bucket/input/elevation.tif"
+    assert storage.exists(src2)
+    assert not storage.exists(src2 + "xxx")
 
 
 @minio
-def test_size(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
+def test_size(mock_s3fs, minio_data_dir):
+    test_data_dir = str(DATA_DIR / "com-test-data/input")
 
-        with minio_serve(tmp_dir):
+    # local
+    src1 = os.path.join(test_data_dir, "elevation.tif")
+    assert storage.size(src1) == 4365
 
-            # local
-            src1 = os.path.join(test_data_dir, "elevation.tif")
-            assert storage.size(src1) == 4365
+    # s3
+    src2 = "s3://bucket/input/elevation.tif"
+    assert storage.size(src2) == 4365
 
-            # s3
-            src2 = "s3://bucket/input/elevation.tif"
-            assert storage.size(src2) == 4365
 
-
-@pytest.mark.skip(reason="issue with timezones")
 @minio
-def test_mtime(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
+def test_stat(mock_s3fs, minio_data_dir):
+    # local
+    src1 = os.path.join(minio_data_dir, "bucket/input/elevation.tif")
+    assert storage._stat(src1)["size"] == 4365
+    assert storage._stat(src1 + ".missing") is None
 
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
-
-        with minio_serve(tmp_dir):
-
-            src1 = os.path.join(tmp_dir, "bucket/input/elevation.tif")
-            src2 = "s3://bucket/input/elevation.tif"
-            assert storage.mtime(src1) == storage.mtime(src2) == os.path.getmtime(src1)
+    # s3
+    src2 = "s3://bucket/input/elevation.tif"
+    assert storage._stat(src2)["size"] == 4365
+    assert storage._stat(src2 + ".missing") is None
 
 
+@pytest.mark.skip(reason="issue with timezones")
 @minio
-def test_open_(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
+def test_mtime(mock_s3fs, minio_data_dir):
+    src1 = os.path.join(minio_data_dir, "bucket/input/elevation.tif")
+    src2 = "s3://bucket/input/elevation.tif"
+    assert storage.mtime(src1) == storage.mtime(src2) == os.path.getmtime(src1)
 
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
 
-        with minio_serve(tmp_dir):
+@minio
+def test_open_(mock_s3fs, minio_data_dir):
+    test_data_dir = str(DATA_DIR / "com-test-data/input")
 
-            with storage.open_(os.path.join(test_data_dir, "meta.json")) as f:
-                assert "com" in f.read()
+    with storage.open_(os.path.join(test_data_dir, "meta.json")) as f:
+        assert "com" in f.read()
 
-            with storage.open_("s3://bucket/input/meta.json") as f:
-                assert "com" in f.read()
+    with storage.open_("s3://bucket/input/meta.json") as f:
+        assert "com" in f.read()
 
 
 @minio
-def test_check_sizes(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
-
-        with minio_serve(tmp_dir):
-
-            src1 = os.path.join(tmp_dir, "bucket/input/elevation.tif")
-            src2 = "s3://bucket/input/elevation.tif"
-            assert storage._check_sizes(src1, src2)
+def test_check_sizes(mock_s3fs, minio_data_dir):
+    src1 = os.path.join(minio_data_dir, "bucket/input/elevation.tif")
+    src2 = "s3://bucket/input/elevation.tif"
+    assert storage._check_sizes(src1, src2)
 
 
 @pytest.mark.skip(reason="issue with timezones")
 @minio
-def test_check_mtimes(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
+def test_check_mtimes(mock_s3fs, minio_data_dir):
+    src1 = os.path.join(minio_data_dir, "bucket/input/elevation.tif")
+    src2 = "s3://bucket/input/elevation.tif"
+    assert not storage._check_mtimes(src1, src2)
 
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/input")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "input"))
 
-        with minio_serve(tmp_dir):
+def test_clean_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "user_cache_dir", lambda appname: str(tmp_path))
+    old = time.time() - 48 * 3600
+    for name in ("old", "recent", "downloads"):
+        (tmp_path / name).mkdir()
+        fp = tmp_path / name / "data"
+        fp.write_bytes(b"")
+        if name != "recent":
+            os.utime(fp, (old, old))
 
-            src1 = os.path.join(tmp_dir, "bucket/input/elevation.tif")
-            src2 = "s3://bucket/input/elevation.tif"
-            assert not storage._check_mtimes(src1, src2)
+    storage.clean_cache_dir(max_hours=24)
+    assert sorted(os.listdir(tmp_path)) == ["downloads", "recent"]
 
 
 def test_no_ending_slash():
@@ -254,42 +272,31 @@ def test_no_ending_slash():
 
 
 @minio
-def test_recursive_download(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-        test_data_dir = resource_filename(__name__, "data/com-test-data/raw")
-        shutil.copytree(test_data_dir, os.path.join(tmp_dir, "bucket", "raw"))
-
-        with minio_serve(tmp_dir):
+def test_recursive_download(mock_s3fs, minio_data_dir, bucket, tmp_path):
+    test_data_dir = str(DATA_DIR / "com-test-data/raw")
+    shutil.copytree(test_data_dir, os.path.join(minio_data_dir, bucket, "raw"))
 
-            src = "s3://bucket/raw"
-            dst = os.path.join(tmp_dir, "raw-test")
-            storage.recursive_download(src, dst, show_progress=False, overwrite=False)
-            fp = os.path.join(dst, "cglc/landcover_Bare.tif")
-            assert os.path.isfile(fp)
-            mtime = os.path.getmtime(fp)
+    src = f"s3://{bucket}/raw"
+    dst = str(tmp_path / "raw-test")
+    storage.recursive_download(src, dst, show_progress=False, overwrite=False)
+    fp = os.path.join(dst, "cglc/landcover_Bare.tif")
+    assert os.path.isfile(fp)
+    mtime = os.path.getmtime(fp)
 
-            # should not be downloaded again
-            storage.recursive_download(src, dst, show_progress=False, overwrite=False)
-            assert os.path.getmtime(fp) == mtime
+    # should not be downloaded again
+    storage.recursive_download(src, dst, show_progress=False, overwrite=False)
+    assert os.path.getmtime(fp) == mtime
 
 
 @minio
-def test_recursive_upload(mock_s3fs):
-    with TemporaryDirectory(prefix="geohealthaccess_") as tmp_dir:
-
-        os.makedirs(os.path.join(tmp_dir, "bucket"))
-
-        with minio_serve(tmp_dir):
-
-            src = resource_filename(__name__, "data/com-test-data/raw")
-            dst = "s3://bucket/com-raw"
-            storage.recursive_upload(src, dst, show_progress=False, overwrite=False)
-            fp = os.path.join(tmp_dir, "bucket/com-raw/cglc/landcover_Bare.tif")
-            assert os.path.isfile(fp)
-            mtime = os.path.getmtime(fp)
-
-            # should not be uploaded again
-            storage.recursive_upload(src, dst, show_progress=False, overwrite=False)
-            assert os.path.getmtime(fp) == mtime
+def test_recursive_upload(mock_s3fs, minio_data_dir, bucket):
+    src = str(DATA_DIR / "com-test-data/raw")
+    dst = f"s3://{bucket}/com-raw"
+    storage.recursive_upload(src, dst, show_progress=False, overwrite=False)
+    fp = os.path.join(minio_data_dir, bucket, "com-raw/cglc/landcover_Bare.tif")
+    assert os.path.isfile(fp)
+    mtime = os.path.getmtime(fp)
+
+    # should not be uploaded again
+    storage.recursive_upload(src, dst, show_progress=False, overwrite=False)
+    assert os.path.getmtime(fp) == mtime
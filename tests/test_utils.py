@@ -5,9 +5,9 @@ import os
 import tempfile
 
 import pytest
-from pkg_resources import resource_filename
 
 from geohealthaccess import utils
+from tests import DATA_DIR
 
 GITHUB = "https://raw.githubusercontent.com/BLSQ/geohealthaccess/master/"
 
@@ -20,6 +20,13 @@ def test_human_readable_size(size, expected):
     assert utils.human_readable_size(size) == expected
 
 
+def test_http_session():
+    with utils.http_session(pool_maxsize=16) as session:
+        adapter = session.get_adapter("https://data.worldpop.org")
+        assert adapter._pool_maxsize == 16
+        assert adapter.max_retries.total == 3
+
+
 def test_country_geometry():
     mdg = utils.country_geometry("mdg")
     assert mdg.is_valid
@@ -27,16 +34,139 @@ def test_country_geometry():
     assert mdg.area == pytest.approx(51.07, 0.01)
 
 
+def test_country_geometry_cached():
+    assert utils.country_geometry("MDG") is utils.country_geometry("mdg")
+
+
 def test_country_geometry_notfound():
     with pytest.raises(ValueError):
         utils.country_geometry("not_a_country")
 
 
 def test_unzip():
-    archive = resource_filename(__name__, "data/madagascar.zip")
-    expected = resource_filename(__name__, "data/madagascar.geojson")
+    archive = str(DATA_DIR / "madagascar.zip")
+    expected = str(DATA_DIR / "madagascar.geojson")
     with tempfile.TemporaryDirectory(prefix="geohealthaccess_") as tmpdir:
         utils.unzip(archive, tmpdir)
         extracted = os.path.join(tmpdir, "madagascar.geojson")
         assert os.path.isfile(extracted)
         assert filecmp.cmp(extracted, expected)
+
+
+def test_unzip_skip_existing(tmp_path):
+    archive = str(DATA_DIR / "madagascar.zip")
+    utils.unzip(archive, str(tmp_path))
+    extracted = tmp_path / "madagascar.geojson"
+    mtime = extracted.stat().st_mtime_ns
+
+    # should not be extracted again
+    utils.unzip(archive, str(tmp_path))
+    assert extracted.stat().st_mtime_ns == mtime
+
+
+def test_conditional_headers(tmp_path):
+    dst_file = tmp_path / "tile.tif"
+    dst_file.write_bytes(b"0123")
+    validators = {
+        "etag": '"abc123"',
+        "last_modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+        "size": 4,
+    }
+    headers = utils._conditional_headers(validators, str(dst_file))
+    assert headers["If-None-Match"] == '"abc123"'
+    assert headers["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+
+    # local copy is not the downloaded one
+    dst_file.write_bytes(b"012345")
+    assert not utils._conditional_headers(validators, str(dst_file))
+    assert not utils._conditional_headers({}, str(dst_file))
+
+
+class _RangeSession:
+    """Fake requests session serving a file with HTTP range requests."""
+
+    def __init__(self, content, etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append(headers)
+        session = self
+
+        class Response:
+            status_code = 200
+            data = session.content
+
+            def __init__(self):
+                self.headers = {"ETag": session.etag}
+                range_ = headers.get("Range")
+                if range_ and headers.get("If-Range") == session.etag:
+                    offset = int(range_[6:-1])
+                    self.status_code = 206
+                    self.data = self.data[offset:]
+                    self.headers["Content-Range"] = (
+                        f"bytes {offset}-{len(session.content) - 1}"
+                        f"/{len(session.content)}"
+                    )
+                self.headers["Content-Length"] = str(len(self.data))
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                return [self.data]
+
+        return Response()
+
+
+@pytest.fixture
+def download_cache(tmp_path, monkeypatch):
+    """Use a temporary download cache and return its base path."""
+    cache_path = tmp_path / "cache" / "key"
+    cache_path.parent.mkdir()
+    monkeypatch.setattr(utils, "_download_cache_path", lambda url, dst: str(cache_path))
+    return cache_path
+
+
+def _download(session, tmp_path):
+    return utils.download_from_url(
+        session,
+        "https://example.com/tile.zip",
+        str(tmp_path / "output"),
+        show_progress=False,
+        resume=True,
+    )
+
+
+def test_download_from_url_resume(tmp_path, download_cache):
+    part_file = tmp_path / "cache" / "key.part"
+    part_file.write_bytes(b"0123")
+    (tmp_path / "cache" / "key.json").write_text('{"etag": "\\"v1\\""}')
+
+    session = _RangeSession(b"0123456789")
+    dst_file = _download(session, tmp_path)
+    assert session.requests[0]["Range"] == "bytes=4-"
+    assert session.requests[0]["If-Range"] == '"v1"'
+    with open(dst_file, "rb") as f:
+        assert f.read() == b"0123456789"
+    assert not part_file.exists()
+
+
+def test_download_from_url_resume_changed(tmp_path, download_cache):
+    part_file = tmp_path / "cache" / "key.part"
+    part_file.write_bytes(b"0123")
+    (tmp_path / "cache" / "key.json").write_text('{"etag": "\\"v1\\""}')
+
+    # the remote file has changed: it is downloaded again from scratch
+    session = _RangeSession(b"abcdefghij", etag='"v2"')
+    dst_file = _download(session, tmp_path)
+    with open(dst_file, "rb") as f:
+        assert f.read() == b"abcdefghij"
@@ -34,3 +34,19 @@ def test_download(monkeypatch):
         )
         assert os.path.isfile(fp)
         assert os.path.basename(fp) == "ben_ppp_2020_UNadj.tif"
+
+
+def test_download_many(monkeypatch):
+    sessions = set()
+
+    def mockreturn(country, output_dir, year, **kwargs):
+        sessions.add(kwargs["session"])
+        return os.path.join(output_dir, f"{country}_{year}.tif")
+
+    monkeypatch.setattr(worldpop, "download", mockreturn)
+
+    jobs = [("ben", 2020), ("mdg", 2019), ("sen", 2018)]
+    files = worldpop.download_many(jobs, "/tmp", workers=2)
+    assert files == ["/tmp/ben_2020.tif", "/tmp/mdg_2019.tif", "/tmp/sen_2018.tif"]
+    # all downloads share the same session
+    assert len(sessions) == 1